@@ -1,5 +1,12 @@
 from .airfoil import Airfoil
+from .batch import AirfoilBatch
+from .library import AirfoilLibrary
+from .parafoil import Parafoil
 try:
-	from .study import XfoilStudy, XfoilCase
+	from .study import XfoilStudy, XfoilCase, ThinAirfoilCase, PanelCase, ResultCache, \
+		XFOIL_IMPORT_ERROR
+	from .backends import BACKENDS, register_backend, get_backend, evaluate
+	if XFOIL_IMPORT_ERROR:
+		print("xfoil disabled due to ImportError: {}".format(XFOIL_IMPORT_ERROR))
 except ImportError as e:
-	print("xfoil disabled due to ImportError: {}".format(e))
+	print("studies disabled due to ImportError: {}".format(e))
@@ -1,7 +1,67 @@
+import functools
 import os
-from copy import copy
+import weakref
 import numpy as np
 
+from airfoil import dat
+from airfoil import geometry
+from airfoil import leading_edge
+from airfoil import panel_method
+from airfoil import resample
+from airfoil import transform
+
+# version of every coordinate buffer which was modified in place (eg. by
+# AirfoilBatch.normalize). Airfoils which share the buffer (views created
+# with Airfoil.from_array) compare it with the version of their cache.
+_buffer_versions = {}
+
+
+def _root_buffer(array):
+    """the array which owns the memory of the view"""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def buffer_version(array):
+    """number of in-place modifications of the memory of the array"""
+    if not isinstance(array, np.ndarray):
+        return 0
+    return _buffer_versions.get(id(_root_buffer(array)), 0)
+
+
+def mark_modified(array):
+    """
+    mark the memory of the array as modified in place, which invalidates the
+    cache of all airfoils using this memory
+    """
+    root = _root_buffer(array)
+    key = id(root)
+    if key not in _buffer_versions:
+        weakref.finalize(root, _buffer_versions.pop, key, None)
+    _buffer_versions[key] = _buffer_versions.get(key, 0) + 1
+
+
+def cached_geometry(func):
+    """
+    read-only property which is computed on the first access and stored in
+    the cache of the airfoil until the coordinates or the noseindex change.
+    Arrays are returned without copying and are read-only, use .copy() to
+    get a modifiable array.
+    """
+    @functools.wraps(func)
+    def getter(self):
+        cache = self._valid_cache()
+        key = (func.__name__, self.noseindex)
+        if key not in cache:
+            value = func(self)
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            cache[key] = value
+        return cache[key]
+    return property(getter)
+
+
 # TODO: numpoints need to be specified per side
 # TODO: there is something wrong with conformal mapping aifoild:
     # some parameter-combination are not working!
@@ -9,14 +69,54 @@ import numpy as np
 
 class Airfoil(object):
     data_profiles = None
+    conformal_mapping = None  # set by the conformal mapping constructors
 
     def __init__(self, coordinates, name="airfoil"):
         self.coordinates = np.array(coordinates)
         self.name = name
         self.noseindex = 0
         self.find_nose()
-        self._panels = None
-        self.vertices = None
+
+    @classmethod
+    def from_array(cls, coordinates, name="airfoil", noseindex=None):
+        """
+        Create an airfoil which uses the coordinates array without copying
+        it (eg. a row of an AirfoilBatch). The nose is only searched if no
+        noseindex is given.
+        """
+        airfoil = cls.__new__(cls)
+        airfoil.coordinates = coordinates
+        airfoil.name = name
+        if noseindex is None:
+            airfoil.noseindex = 0
+            airfoil.find_nose()
+        else:
+            airfoil.noseindex = int(noseindex)
+        return airfoil
+
+    @property
+    def coordinates(self):
+        return self._coordinates
+
+    @coordinates.setter
+    def coordinates(self, coordinates):
+        self._coordinates = coordinates
+        self._clear_cache()
+
+    def _clear_cache(self):
+        """
+        remove all cached values which are derived from the coordinates. Needs
+        to be called if the coordinates array is modified in place (or use
+        mark_modified if other airfoils share the array).
+        """
+        self._cache = {}
+        self._cache_version = buffer_version(self._coordinates)
+
+    def _valid_cache(self):
+        """the cache, cleared if the coordinates were modified in place"""
+        if self._cache_version != buffer_version(self._coordinates):
+            self._clear_cache()
+        return self._cache
 
     def __repr__(self):
         return(str(self.coordinates))
@@ -30,42 +130,106 @@ class Airfoil(object):
     def get_lower_data(self):
         return self.coordinates[self.noseindex - 1:]
 
+    # derived geometry, see: airfoil.geometry
+    # the values are cached (read-only arrays) until the coordinates are
+    # assigned or modified by normalize, move_nose, resample, ...
+
+    @cached_geometry
+    def upper(self):
+        """upper side from the trailing edge to the nose (view)"""
+        return self.coordinates[:self.noseindex + 1]
+
+    @cached_geometry
+    def lower(self):
+        """lower side from the nose to the trailing edge (view)"""
+        return self.coordinates[self.noseindex:]
+
+    @cached_geometry
+    def vertices(self):
+        """coordinates without the duplicated trailing edge point (view)"""
+        if len(self.coordinates) > 1 and np.array_equal(self.coordinates[0],
+                                                        self.coordinates[-1]):
+            return self.coordinates[:-1]
+        return self.coordinates[:]
+
+    @cached_geometry
+    def panels(self):
+        """start- and end-points of the panels"""
+        return geometry.panels(self.coordinates)
+
+    @cached_geometry
+    def panel_lengths(self):
+        return geometry.panel_lengths(self.coordinates)
+
+    @cached_geometry
+    def arc_length(self):
+        """cumulative length along the coordinates normalized to [0, 1]"""
+        return resample.arc_length(self.coordinates)
+
+    @cached_geometry
+    def curvature(self):
+        return resample.curvature(self.coordinates)
+
+    @cached_geometry
+    def tangents(self):
+        """unit tangents of the panels"""
+        return geometry.tangents(self.coordinates)
+
+    @cached_geometry
+    def normals(self):
+        """outward unit normals of the panels"""
+        return geometry.normals(self.coordinates)
+
+    @cached_geometry
+    def _thickness_camber(self):
+        numpoints = max(len(self.coordinates) // 2 + 1, 2)
+        return geometry.thickness_camber(self.coordinates, self.noseindex,
+                                         geometry.chord_positions(numpoints))
+
+    @cached_geometry
+    def thickness(self):
+        """thickness distribution: columns x, thickness"""
+        x, thickness, _ = self._thickness_camber
+        return np.array([x, thickness]).T
+
+    @cached_geometry
+    def camber(self):
+        """camber line: columns x, camber"""
+        x, _, camber = self._thickness_camber
+        return np.array([x, camber]).T
+
+    @cached_geometry
+    def area(self):
+        return float(geometry.area(self.coordinates))
+
+    @cached_geometry
+    def panel_solver(self):
+        """inviscid linear-vortex panel solver, see: airfoil.panel_method"""
+        return panel_method.LinearVortexSolver(self.coordinates)
+
+    @cached_geometry
+    def _geometry(self):
+        return geometry.analyze(self.coordinates, self.noseindex)
+
+    def get_geometry(self):
+        """
+        max. thickness, max. camber (and their positions), leading edge
+        radius, trailing edge angle, trailing edge thickness and area as a
+        structured array, see: airfoil.geometry.analyze
+        """
+        return self._geometry
+
     @property
     def x_values(self):
         """Get XValues of airfoil. upper side neg, lower positive"""
-        return [((i > self.noseindex) * 2 - 1) * val[0]
-                for i, val in enumerate(self.coordinates)]
+        return resample.signed_x(self.coordinates, self.noseindex)
 
     @x_values.setter
     def x_values(self, xval):
         """Set X-Values of airfoil to defined points."""
         # assume that coordinates are allready ordered (-1, ..., 0, ... 1)
         # self.coordinates ... numpy array
-
-        coords = copy(self.coordinates)
-        self.coordinates = []
-
-        def x(i):
-            return coords[i, 0] * ((i > self.noseindex) * 2 - 1)
-
-        def t(i, xval):
-            # interpolation:
-            # x1-----x1+ t*(x - x1)--------x
-            return (xval - x(i-1)) / (x(i) - x(i-1))
-
-        def xy(i, t):
-            return coords[i - 1] * (1 - t) + coords[i] * t
-
-        i = 0
-        for x_new in xval:
-            while x(i) <= x_new:
-                if i >= len(coords) - 2:
-                    break
-                else:
-                    i += 1
-            ti = t(i, x_new)
-            self.coordinates.append(xy(i, ti))
-        self.coordinates = np.array(self.coordinates)
+        self.coordinates = resample.interpolate(self.coordinates, self.x_values, xval)
         self.find_nose()
         self.normalize()
 
@@ -77,135 +241,189 @@ class Airfoil(object):
     def numpoints(self, numpoints):
         self.x_values = self.cos_2_distribution(numpoints)
 
+    def resample(self, numpoints, distribution="cos_2", curvature_factor=0.5):
+        """
+        Resample the airfoil with a new distribution of the coordinates.
+        see: airfoil.resample.resample
+        """
+        self.coordinates = resample.resample(self.coordinates, self.noseindex,
+                                             distribution, numpoints,
+                                             curvature_factor)
+        self.find_nose()
+        self.normalize()
+
     def find_nose(self, method="max-curvature"):
-        if method == "min-x-value":
-            i = 0
-            while (self.coordinates[i + 1][0] < self.coordinates[i][0]
-                   and i < len(self.coordinates)):
-                i += 1
-            self.noseindex = i
-        elif method == "max-curvature":
-            curvature = self.get_curvature()
-            self.noseindex = np.argmax(curvature)
+        """
+        set the noseindex to the point with the max. curvature
+        ("max-curvature") or to the point with the min. x-value ("min-x-value")
+        """
+        self.noseindex = int(leading_edge.nose_index(self.coordinates, method))
 
+    def get_leading_edge(self):
+        """
+        returns the leading edge point (located between the coordinates) and
+        its fractional index. The result is cached until the coordinates change.
+        see: airfoil.leading_edge.leading_edge
+        """
+        cache = self._valid_cache()
+        key = ("leading_edge", self.noseindex)
+        if key not in cache:
+            cache[key] = leading_edge.leading_edge(self.coordinates, self.noseindex)
+        return cache[key]
 
     def get_curvature(self):
-        # https://math.stackexchange.com/a/213678
-        A = self.coordinates[0:-3]
-        B = self.coordinates[1:-2]
-        C = self.coordinates[2:-1]
-        AB = np.linalg.norm(B - A, axis=1)
-        BC = np.linalg.norm(C - B, axis=1)
-        AC = np.linalg.norm(C - A, axis=1)
-        curvature = 2 * abs(np.cross(B - A, C - A, axis=1)) / (AB * BC * AC)
-        curvature = np.array([0.] + curvature.tolist() + [0.])
-        return curvature
+        """curvature at the coordinates (a modifiable copy of the cached array)"""
+        return self.curvature.copy()
 
 
 
-    def normalize(self, noseindex=None):
+    def normalize(self, noseindex=None, in_place=False):
         """
         Normalize the airfoil.
         This routine does:
             *Put the nose back to (0,0)
             *De-rotate airfoil
             *Reset its length to 1
+        in_place: overwrite the coordinates array instead of creating a new one
+        returns the applied transformation (see airfoil.transform)
         """
-
-        def norm_squared(vec_2):
-            return vec_2[0] ** 2 + vec_2[1] ** 2
-
-        p1 = self.coordinates[0]
-        nose = self.coordinates[noseindex or self.noseindex]
-        diff = p1 - nose  # put nose to (0,0)
-
-        # Angle: a.b=|a|*|b|*sin(alpha)
-        sin_sq = diff.dot([0, -1]) / norm_squared(diff)
-        cos_sq = diff.dot([1, 0]) / norm_squared(diff)
-        # de-rotate and scale
-        matrix = np.array([[cos_sq, -sin_sq], [sin_sq, cos_sq]])
-        self.coordinates = np.array([matrix.dot(i - nose) for i in self.coordinates])
-        self.coordinates[-1] = self.coordinates[0]
-
-    def move_nose(self):
+        noseindex = self.noseindex if noseindex is None else noseindex
+        normalization = transform.normalization(self.coordinates, noseindex)
+        if in_place:
+            normalization.apply(self.coordinates, out=self.coordinates)
+            self.coordinates[-1] = self.coordinates[0]
+            mark_modified(self.coordinates)
+        else:
+            self.coordinates = normalization.apply(self.coordinates)
+            self.coordinates[-1] = self.coordinates[0]
+        self._clear_cache()
+        return normalization
+
+    def move_nose(self, in_place=False):
         """
-        moves the nose coordinates to the further-most position. Assumes the profile is already normalized
+        moves the nose coordinates to the leading edge located between the
+        coordinates (see get_leading_edge) and normalizes the airfoil
+        in_place: overwrite the coordinates array, otherwise the array (eg.
+        shared with an AirfoilBatch) is not modified
         """
-        x, y = self.coordinates[self.noseindex - 1 : self.noseindex + 2].T
-        ones = np.ones(3)
-        mat = np.array([ones, y, y**2]).T
-        c = np.linalg.solve(mat, x)
-        y_new = -c[1] / 2 / c[2]
-        x_new = c[0] + c[1] * y_new + c[2] * y_new**2
-        self.coordinates[self.noseindex] = np.array([x_new, y_new])
-        self.normalize()
+        le_point = self.get_leading_edge()[0]
+        if not in_place:
+            self.coordinates = np.array(self.coordinates)
+        self.coordinates[self.noseindex] = le_point
+        return self.normalize(in_place=in_place)
 
 
     @classmethod
     def compute_naca(cls, naca:str="1234", numpoints:int=100):
         """Compute and return a four-digit naca-airfoil"""
-        # See: http://people.clarkson.edu/~pmarzocc/AE429/The%20NACA%20airfoil%20series.pdf
-        # and: http://airfoiltools.com/airfoil/naca4digit
-        naca = float(naca)
-        m = int(naca / 1000) * 0.01  # Maximum Camber Position
+        coordinates = cls.compute_naca_batch([naca], numpoints)[0]
+        profile = cls(coordinates, name="NACA_" + str(float(naca)))
+        # profile.find_nose()
+        # profile.normalize()
+        return profile
+
+    @staticmethod
+    def _naca_parameters(nacas):
+        """
+        returns the arrays m, p, t and the names of a list of four-digit naca
+        codes (strings or numbers) or of an array of (m, p, t) triples
+        """
+        nacas_array = np.asarray(nacas)
+        if nacas_array.ndim == 2 and nacas_array.shape[1] == 3 and \
+                nacas_array.dtype.kind in "iuf":
+            m, p, t = nacas_array.astype(float).T
+            names = ["NACA_m=" + str(mi) + "_p=" + str(pi) + "_t=" + str(ti)
+                     for mi, pi, ti in zip(m, p, t)]
+            return m, p, t, names
+        naca = np.array([float(i) for i in nacas_array.ravel()])
+        m = np.trunc(naca / 1000) * 0.01  # Maximum Camber Position
         # second digit: Maximum Thickness position
-        p = int((naca % 1000) / 100) * 0.1
+        p = np.trunc((naca % 1000) / 100) * 0.1
         t = (naca % 100) * 0.01  # last two digits: Maximum Thickness(%)
-        x_values = [
-            1 - np.sin((x * 1. / (numpoints - 1)) * np.pi / 2) for x in range(numpoints)]
+        names = ["NACA_" + str(i) for i in naca.tolist()]
+        return m, p, t, names
+
+    @classmethod
+    def compute_naca_batch(cls, nacas, numpoints:int=100, as_airfoils:bool=False):
+        """
+        Compute many four-digit naca-airfoils at once.
+        nacas: list of naca-digits (eg.: ["2412", "0012"]) or an array of
+               (m, p, t) triples
+        returns a contiguous array with shape (n_airfoils, 2 * numpoints - 1, 2)
+        or, if as_airfoils is set, a generator which creates the Airfoil
+        objects only when they are requested
+        """
+        # See: http://people.clarkson.edu/~pmarzocc/AE429/The%20NACA%20airfoil%20series.pdf
+        # and: http://airfoiltools.com/airfoil/naca4digit
+        m, p, t, names = cls._naca_parameters(nacas)
+        m = m[:, None]
+        p = p[:, None]
+        t = t[:, None]
+        x = 1 - np.sin(np.arange(numpoints) * 1. / (numpoints - 1) * np.pi / 2)
+        x = x[None, :]
 
-        upper = []
-        lower = []
         a0 = 0.2969
         a1 = -0.126
         a2 = -0.3516
         a3 = 0.2843
         a4 = -0.1036            # modified for closed profile
 
-        for x in x_values:
-            if x < p:
-                mean_camber = (m / (p ** 2) * (2 * p * x - x ** 2))
-                gradient = 2 * m / (p ** 2) * (p - x)
-            else:
-                mean_camber = (
-                    m / ((1 - p) ** 2) * ((1 - 2 * p) + 2 * p * x - x ** 2))
-                gradient = 2 * m / (1 - p ** 2) * (p - x)
-
-            thickness_this = t / 0.2 * \
-                (a0 * np.sqrt(x) + a1 * x + a2 * x **
-                 2 + a3 * x ** 3 + a4 * x ** 4)
-            #theta = math.atan(gradient)
-            costheta = (1 + gradient ** 2) ** (-0.5)
-            sintheta = gradient * costheta
-            upper.append([x - thickness_this * sintheta,
-                          mean_camber + thickness_this * costheta])
-            lower.append([x + thickness_this * sintheta,
-                          mean_camber - thickness_this * costheta])
-        profile = cls(upper + lower[::-1][1:], name="NACA_" + str(naca))
-        # profile.find_nose()
-        # profile.normalize()
-        return profile
+        # the front part is only used where x < p, so a division by p = 0
+        # is never part of the result
+        with np.errstate(divide="ignore", invalid="ignore"):
+            front_camber = m / (p ** 2) * (2 * p * x - x ** 2)
+            front_gradient = 2 * m / (p ** 2) * (p - x)
+        back_camber = m / ((1 - p) ** 2) * ((1 - 2 * p) + 2 * p * x - x ** 2)
+        back_gradient = 2 * m / (1 - p ** 2) * (p - x)
+        is_front = x < p
+        mean_camber = np.where(is_front, front_camber, back_camber)
+        gradient = np.where(is_front, front_gradient, back_gradient)
+
+        thickness = t / 0.2 * \
+            (a0 * np.sqrt(x) + a1 * x + a2 * x **
+             2 + a3 * x ** 3 + a4 * x ** 4)
+        costheta = (1 + gradient ** 2) ** (-0.5)
+        sintheta = gradient * costheta
+
+        coordinates = np.empty((len(names), 2 * numpoints - 1, 2))
+        coordinates[:, :numpoints, 0] = x - thickness * sintheta
+        coordinates[:, :numpoints, 1] = mean_camber + thickness * costheta
+        coordinates[:, numpoints:, 0] = (x + thickness * sintheta)[:, -2::-1]
+        coordinates[:, numpoints:, 1] = (mean_camber - thickness * costheta)[:, -2::-1]
+
+        if as_airfoils:
+            return (cls(c, name) for c, name in zip(coordinates, names))
+        return coordinates
 
     @classmethod
     def compute_joukowsky(cls, midpoint=-0.1+0.1j, numpoints=100):
         from airfoil.conformal_mapping import JoukowskyAirfoil
         airfoil = JoukowskyAirfoil(midpoint)
-        profile = [[c.real, c.imag] for c in airfoil.coordinates(numpoints)]
+        # the chord line of the mapping (see ConformalCase) is the x-axis. The
+        # max. curvature is at the cusped trailing edge and next to the nose
+        # there are negative x-values, so the nose is the point with the
+        # min. x-value and the coordinates are resampled without normalizing.
+        leading_edge, trailing_edge = airfoil.chord_line()
+        coordinates = (airfoil.coordinates(numpoints) - leading_edge) / (trailing_edge - leading_edge)
+        profile = np.array([coordinates.real, coordinates.imag]).T
 
         profile = cls(profile, "joukowsky_" + str(midpoint))
-        profile.find_nose()
-        profile.normalize()
-        # profilce.move_nose()
-        profile.numpoints = numpoints
+        profile.conformal_mapping = airfoil
+        profile.find_nose("min-x-value")
+        profile.coordinates = resample.resample(profile.coordinates, profile.noseindex,
+                                                "cos_2", numpoints)
+        profile.find_nose("min-x-value")
         return profile
 
     @classmethod
     def compute_vandevooren(cls, tau=0.05, epsilon=0.05, numpoints=100):
         from airfoil.conformal_mapping import VanDeVoorenAirfoil
         airfoil = VanDeVoorenAirfoil(tau=tau, epsilon=epsilon)
-        profile = [[c.real, c.imag] for c in airfoil.coordinates(numpoints)]
+        coordinates = airfoil.coordinates(numpoints)
+        profile = np.array([coordinates.real, coordinates.imag]).T
 
         profile = cls(profile, "VanDeVooren_tau=" + str(tau) + "_epsilon=" + str(epsilon))
+        profile.conformal_mapping = airfoil
         profile.find_nose()
         profile.normalize()
         # profile.move_nose()
@@ -215,9 +433,11 @@ class Airfoil(object):
     def compute_trefftz_kutta(cls, midpoint=-0.1+0.1j, tau=0.05, numpoints=100):
         from airfoil.conformal_mapping import TrefftzKuttaAirfoil
         airfoil = TrefftzKuttaAirfoil(midpoint=midpoint, tau=tau)
-        profile = [[c.real, c.imag] for c in airfoil.coordinates(numpoints)]
+        coordinates = airfoil.coordinates(numpoints)
+        profile = np.array([coordinates.real, coordinates.imag]).T
 
         profile = cls(profile, "TrefftzKuttaAirfoil_m=" + str(midpoint) + "_tau=" + str(tau))
+        profile.conformal_mapping = airfoil
         profile.find_nose()
         profile.normalize()
         # profile.move_nose()
@@ -225,16 +445,12 @@ class Airfoil(object):
 
     @classmethod
     def import_from_text(cls, text, name=None):
-        name = name
-        profile = []
-        for i, line in enumerate(text):
-            if i > 0:
-                split_line = line.split()
-                if len(split_line) == 2:
-                    profile.append([float(i) for i in split_line])
-                else:
-                    name = line
-        airfoil = cls(profile, name)
+        """
+        Import an airfoil from the text of a '.dat' file (selig or lednicer
+        format, see airfoil.dat.parse_dat)
+        """
+        header, profile = dat.parse_dat(text)
+        airfoil = cls(profile, name or header)
         # airfoil.normalize()
         # airfoil.move_nose()
         return airfoil
@@ -249,15 +465,15 @@ class Airfoil(object):
         with open(path, "r") as p_file:
             return Airfoil.import_from_text(p_file, name)
 
-    def export_dat(self, pfad):
+    def export_dat(self, pfad, file_format="selig", precision=None):
         """
         Export airfoil to .dat Format
+        file_format: "selig", "lednicer", "xfoil" or "csv"
+        precision: number of decimals (None: shortest exact representation)
         """
         with open(pfad, "w") as out:
-            if self.name:
-                out.write(str(self.name))
-            for i in self.coordinates:
-                out.write("\n" + str(i[0]) + "\t" + str(i[1]))
+            out.write(dat.format_dat(self.name, self.coordinates, file_format,
+                                     precision, self.noseindex))
         return pfad
 
     @staticmethod
@@ -265,10 +481,7 @@ class Airfoil(object):
         """
         return cosinus distributed x-values
         """
-        numpoints -= numpoints % 2
-        xtemp = lambda x: ((x > 0.5) - (x < 0.5)) * \
-            (1 - np.sin(np.pi * x))
-        return [xtemp(i / numpoints) for i in range(numpoints + 1)]
+        return resample.cos_distribution(numpoints)
 
     @staticmethod
     def cos_2_distribution(numpoints):
@@ -276,7 +489,4 @@ class Airfoil(object):
         return cosinus distributed x-values
         double-cosinus -> neat distribution at nose and trailing edge
         """
-        numpoints -= numpoints % 2
-        xtemp = lambda x: ((x > 0.5) - (x < 0.5)) * \
-            (1 + np.cos(2 * np.pi * x)) / 2
-        return [xtemp(i / numpoints) for i in range(numpoints + 1)]
+        return resample.cos_2_distribution(numpoints)
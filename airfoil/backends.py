@@ -0,0 +1,347 @@
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from airfoil.study import XfoilCase, ThinAirfoilCase, PanelCase, ResultAccumulator, \
+    _compute_case, _compute_chunk, _run_with_timeout, _FailedCase, CachedCase, _input
+
+# solver backends
+# A backend is a case-class with the interface of XfoilCase:
+#   case = backend(airfoil)
+#   case.compute_coefficients(params) -> dict with alpha, cl, cd, cm, converged
+#                                        (and the params)
+#   case.compute_polar(values, input_key, params) -> dict of arrays
+#   case.close() / context-manager
+#   backend.default_params
+# backends are registered by name and can be used everywhere a case_class
+# is expected (XfoilStudy, evaluate, ParafoilProxy.optimize).
+
+BACKENDS = {}
+
+
+def register_backend(name):
+    """class decorator which registers a backend under the name"""
+    def register(backend):
+        BACKENDS[name] = backend
+        return backend
+    return register
+
+
+def get_backend(backend):
+    """returns the registered backend for a name, classes are returned unchanged"""
+    if isinstance(backend, str):
+        try:
+            return BACKENDS[backend]
+        except KeyError:
+            raise ValueError("unknown backend: {} (available: {})".format(
+                backend, ", ".join(sorted(BACKENDS))))
+    return backend
+
+
+register_backend("xfoil")(XfoilCase)
+register_backend("thin")(ThinAirfoilCase)
+register_backend("panel")(PanelCase)
+
+
+def _polar_from_responses(responses, values, input_key, params):
+    polar = {key: np.array([response[key] for response in responses])
+             for key in ["alpha", "cl", "cd", "cm", "converged"]}
+    polar[input_key] = np.asarray(values, dtype=float)
+    for key in ["re", "mach", "ncrit"]:
+        polar[key] = np.full(len(values), params[key])
+    return polar
+
+
+@register_backend("xfoil-executable")
+class XfoilExecutableCase(object):
+    """
+    Drives an external xfoil executable over stdin/stdout. Every polar is
+    computed by one xfoil process, the parallel evaluation (XfoilStudy or
+    evaluate with workers) runs one xfoil process per worker.
+    """
+    default_params = XfoilCase.default_params
+    executable = "xfoil"
+
+    def __init__(self, airfoil, executable=None, timeout=None):
+        self.airfoil = airfoil
+        self.executable = executable or self.executable
+        self.timeout = timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def _commands(self, dat_file, polar_file, values, input_key, params, max_iterations):
+        commands = ["PLOP", "G F", "", "LOAD " + dat_file, "PANE", "OPER"]
+        if params.get("re"):
+            commands += ["VISC {}".format(params["re"])]
+        commands += ["MACH {}".format(params["mach"]),
+                     "VPAR", "N {}".format(params["ncrit"]), "",
+                     "ITER {}".format(max_iterations),
+                     "PACC", polar_file, ""]
+        command = "ALFA {}" if input_key == "alpha_input" else "CL {}"
+        commands += [command.format(value) for value in values]
+        commands += ["PACC", "", "QUIT", ""]
+        return "\n".join(commands)
+
+    @staticmethod
+    def _read_polar(polar_file):
+        """returns the rows (alpha, cl, cd, cdp, cm, ...) of a xfoil polar-file"""
+        with open(polar_file) as p_file:
+            lines = p_file.read().splitlines()
+        for i, line in enumerate(lines):
+            if line.strip().startswith("-----"):
+                rows = [line.split() for line in lines[i + 1:] if line.strip()]
+                return np.array(rows, dtype=float).reshape(-1, len(rows[0]) if rows else 7)
+        return np.empty((0, 7))
+
+    def compute_polar(self, values, input_key="alpha_input", params=None,
+                      max_iterations=100, max_halvings=3):
+        """
+        compute a polar for the values of alpha or cl with one xfoil process
+        (see XfoilCase.compute_polar). Values which didn't converge are not
+        written to the polar-file by xfoil and are returned as nan.
+        """
+        params = params or self.default_params
+        values = np.asarray(values, dtype=float)
+        with tempfile.TemporaryDirectory() as directory:
+            dat_file = os.path.join(directory, "airfoil.dat")
+            polar_file = os.path.join(directory, "polar.txt")
+            self.airfoil.export_dat(dat_file, file_format="xfoil")
+            subprocess.run([self.executable], cwd=directory, timeout=self.timeout,
+                           input=self._commands("airfoil.dat", "polar.txt", values,
+                                                input_key, params, max_iterations),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           universal_newlines=True, check=False)
+            rows = self._read_polar(polar_file) if os.path.exists(polar_file) else np.empty((0, 7))
+        # xfoil writes alpha and cl with 3 (4) decimals
+        column = 0 if input_key == "alpha_input" else 1
+        polar = {key: np.full(len(values), np.nan) for key in ["alpha", "cl", "cd", "cm"]}
+        polar["converged"] = np.zeros(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            if len(rows):
+                j = np.argmin(abs(rows[:, column] - value))
+                if abs(rows[j, column] - value) < 1e-3:
+                    polar["alpha"][i], polar["cl"][i], polar["cd"][i] = rows[j, :3]
+                    polar["cm"][i] = rows[j, 4]
+                    polar["converged"][i] = True
+        polar[input_key] = values
+        for key in ["re", "mach", "ncrit"]:
+            polar[key] = np.full(len(values), params[key])
+        return polar
+
+    def compute_coefficients(self, params=None, max_iterations=100):
+        params = params or self.default_params
+        input_key, value = _input(params)
+        polar = self.compute_polar([value], input_key, params, max_iterations)
+        response = {key: polar[key][0].item() for key in ["alpha", "cl", "cd", "cm", "converged"]}
+        response.update(params)
+        return response
+
+
+@register_backend("conformal")
+class ConformalCase(object):
+    """
+    Analytic inviscid solution of airfoils created by a conformal mapping
+    (Airfoil.compute_joukowsky, compute_vandevooren, compute_trefftz_kutta),
+    see JoukowskyAirfoil.cl and JoukowskyAirfoil.cm. The angle of attack is
+    measured against the chord line (trailing edge to the point furthest
+    from the trailing edge).
+    """
+    default_params = XfoilCase.default_params
+
+    def __init__(self, airfoil):
+        mapping = getattr(airfoil, "conformal_mapping", None)
+        if mapping is None:
+            raise ValueError("{} was not created by a conformal mapping".format(airfoil.name))
+        self.airfoil = airfoil
+        self.mapping = mapping
+        leading_edge, trailing_edge = mapping.chord_line()
+        self.chord = abs(trailing_edge - leading_edge)
+        self.chord_angle = np.angle(trailing_edge - leading_edge)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def _mapping_alpha(self, alpha):
+        """angle of attack [rad] in the plane of the mapping"""
+        return np.deg2rad(alpha) + self.chord_angle
+
+    def cl(self, alpha):
+        return self.mapping.cl(self._mapping_alpha(alpha))
+
+    def cm(self, alpha):
+        """moment coefficient around the quarter chord point (nose up positive)"""
+        return self.mapping.cm(self._mapping_alpha(alpha))
+
+    def _alpha_from_cl(self, cl):
+        # cl = 8 pi r / c * sin(alpha_m + beta)
+        amplitude = 8 * np.pi * self.mapping.radius / self.chord
+        alpha_m = np.arcsin(np.clip(cl / amplitude, -1, 1)) - self.mapping.beta
+        return np.rad2deg(alpha_m - self.chord_angle)
+
+    def compute_coefficients(self, params=None, max_iterations=100):
+        params = params or self.default_params
+        input_key, value = _input(params)
+        alpha = value if input_key == "alpha_input" else self._alpha_from_cl(value)
+        response = {
+            "alpha": float(alpha),
+            "cl": float(self.cl(alpha)),
+            "cd": 0.,
+            "cm": float(self.cm(alpha)),
+            "converged": True
+        }
+        response.update(params)
+        return response
+
+    def compute_polar(self, values, input_key="alpha_input", params=None,
+                      max_iterations=100, max_halvings=3):
+        """all values are computed at once with the alpha-arrays of the mapping"""
+        params = params or self.default_params
+        values = np.asarray(values, dtype=float)
+        alpha = values if input_key == "alpha_input" else self._alpha_from_cl(values)
+        polar = {
+            "alpha": alpha,
+            "cl": self.cl(alpha),
+            "cd": np.zeros(len(values)),
+            "cm": self.cm(alpha),
+            "converged": np.ones(len(values), dtype=bool),
+            input_key: values
+        }
+        for key in ["re", "mach", "ncrit"]:
+            polar[key] = np.full(len(values), params[key])
+        return polar
+
+
+@register_backend("mock")
+class MockCase(object):
+    """
+    Cheap and deterministic stand-in backend to test scheduling and caching
+    without any solver: the coefficients follow from the geometry
+    (camber and thickness) with simple formulas.
+    delay: seconds every computation sleeps
+    fail_above: alpha (or cl) inputs above this value raise a RuntimeError
+    num_calls counts the computations of this instance.
+    """
+    default_params = XfoilCase.default_params
+
+    def __init__(self, airfoil, delay=0., fail_above=None):
+        self.airfoil = airfoil
+        self.delay = delay
+        self.fail_above = fail_above
+        self.num_calls = 0
+        geometry = airfoil.get_geometry()
+        self.alpha_0 = -2 * float(geometry["max_camber"])
+        self.cm_0 = -np.pi * float(geometry["max_camber"])
+        self.cd_0 = 0.005 + 0.02 * float(geometry["max_thickness"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def compute_coefficients(self, params=None, max_iterations=100):
+        params = params or self.default_params
+        input_key, value = _input(params)
+        self.num_calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_above is not None and value > self.fail_above:
+            raise RuntimeError("mock failure for {}={}".format(input_key, value))
+        if input_key == "alpha_input":
+            alpha = value
+            cl = 2 * np.pi * (np.deg2rad(alpha) - self.alpha_0)
+        else:
+            cl = value
+            alpha = np.rad2deg(cl / 2 / np.pi + self.alpha_0)
+        response = {
+            "alpha": float(alpha),
+            "cl": float(cl),
+            "cd": self.cd_0 + 0.01 * cl ** 2,
+            "cm": self.cm_0,
+            "converged": True
+        }
+        response.update(params)
+        return response
+
+    def compute_polar(self, values, input_key="alpha_input", params=None,
+                      max_iterations=100, max_halvings=3):
+        params = params or self.default_params
+        other_key = "cl_input" if input_key == "alpha_input" else "alpha_input"
+        responses = [self.compute_coefficients(dict(params, **{input_key: value, other_key: None}))
+                     for value in values]
+        return _polar_from_responses(responses, values, input_key, params)
+
+
+def evaluate(airfoils, params_df, backend="xfoil", workers=None, chunksize=16,
+             timeout=None, cache=None):
+    """
+    evaluate every airfoil for every row of params_df (geometry x conditions)
+    backend: name of a registered backend or a case-class
+    workers: number of worker processes, None computes all cases in this process
+    timeout: max time in seconds for a single case, see XfoilStudy.run_study
+    returns a DataFrame with one row per airfoil and condition, the columns
+    "airfoil" (name) and "airfoil_index" identify the geometry
+    """
+    case_class = get_backend(backend)
+    airfoils = list(airfoils)
+    conditions = params_df.to_dict("records")
+    accumulator = ResultAccumulator(capacity=max(len(airfoils) * len(conditions), 1))
+
+    def append(i, results):
+        for index, response in results:
+            response["airfoil"] = airfoils[i].name
+            response["airfoil_index"] = i
+            accumulator.append(response, len(accumulator))
+
+    if timeout:
+        tasks = [((i, j), i, params) for i in range(len(airfoils))
+                 for j, params in enumerate(conditions)]
+        results = sorted(_run_with_timeout(case_class, airfoils, tasks, workers or 1,
+                                           timeout, cache), key=lambda result: result[0])
+        for (i, j), response in results:
+            append(i, [(j, response)])
+        return accumulator.to_dataframe()
+
+    if not workers:
+        for i, airfoil in enumerate(airfoils):
+            case = case_class(airfoil)
+            if cache is not None:
+                case = CachedCase(case, cache)
+            with case:
+                append(i, [(j, _compute_case(case, params))
+                           for j, params in enumerate(conditions)])
+        return accumulator.to_dataframe()
+
+    cases = list(enumerate(conditions))
+    chunks = [cases[j:j + chunksize] for j in range(0, len(cases), chunksize)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(i, chunk, executor.submit(_compute_chunk, case_class, airfoil,
+                                              chunk, cache))
+                   for i, airfoil in enumerate(airfoils) for chunk in chunks]
+        for i, chunk, future in futures:
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [(j, _compute_case(_FailedCase(e), params)) for j, params in chunk]
+            append(i, results)
+    return accumulator.to_dataframe()
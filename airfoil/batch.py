@@ -0,0 +1,150 @@
+import numpy as np
+
+from airfoil import geometry
+from airfoil import leading_edge
+from airfoil import resample
+from airfoil import transform
+from airfoil.airfoil import Airfoil, mark_modified
+
+
+class AirfoilBatch(object):
+    """
+    Many airfoils with the same number of coordinates stored in one
+    array with shape (numairfoils, numpoints, 2). A float array is used
+    without copying.
+    Indexing with an integer returns an Airfoil which shares the memory with
+    the batch (normalize and move_nose invalidate its cached geometry),
+    slicing (eg. batch[::2]) returns an AirfoilBatch view. Index arrays and
+    masks return a copy (like numpy fancy indexing).
+    """
+
+    def __init__(self, coordinates, names=None, noseindex=None):
+        self.coordinates = np.asarray(coordinates, dtype=float)
+        assert self.coordinates.ndim == 3 and self.coordinates.shape[-1] == 2
+        if names is None:
+            names = ["airfoil_" + str(i) for i in range(len(self.coordinates))]
+        self.names = list(names)
+        assert len(self.names) == len(self.coordinates)
+        if noseindex is None:
+            self.noseindex = np.zeros(len(self.coordinates), dtype=int)
+            self.find_nose()
+        else:
+            self.noseindex = np.asarray(noseindex, dtype=int)
+
+    @classmethod
+    def from_airfoils(cls, airfoils):
+        """
+        Stack a list of airfoils (with the same number of coordinates)
+        """
+        airfoils = list(airfoils)
+        coordinates = np.array([airfoil.coordinates for airfoil in airfoils])
+        names = [airfoil.name for airfoil in airfoils]
+        noseindex = [airfoil.noseindex for airfoil in airfoils]
+        return cls(coordinates, names, noseindex)
+
+    @classmethod
+    def compute_naca(cls, nacas, numpoints:int=100):
+        """Compute a batch of four-digit naca-airfoils"""
+        coordinates = Airfoil.compute_naca_batch(nacas, numpoints)
+        names = Airfoil._naca_parameters(nacas)[3]
+        return cls(coordinates, names)
+
+    def __repr__(self):
+        return "AirfoilBatch({} airfoils, {} points)".format(*self.coordinates.shape[:2])
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Airfoil.from_array(self.coordinates[index], self.names[index],
+                                      self.noseindex[index])
+        rows = np.arange(len(self))[index]
+        return AirfoilBatch(self.coordinates[index],
+                            [self.names[i] for i in rows],
+                            self.noseindex[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def numpoints(self):
+        return self.coordinates.shape[1]
+
+    @numpoints.setter
+    def numpoints(self, numpoints):
+        self.x_values = resample.cos_2_distribution(numpoints)
+
+    @property
+    def x_values(self):
+        """Get XValues of all airfoils. upper side neg, lower positive"""
+        return resample.signed_x(self.coordinates, self.noseindex)
+
+    @x_values.setter
+    def x_values(self, xval):
+        """Set X-Values of all airfoils to defined points."""
+        self.coordinates = resample.interpolate(self.coordinates, self.x_values, xval)
+        self.find_nose()
+        self.normalize()
+
+    def resample(self, numpoints, distribution="cos_2", curvature_factor=0.5):
+        """
+        Resample all airfoils with a new distribution of the coordinates.
+        see: airfoil.resample.resample
+        """
+        self.coordinates = resample.resample(self.coordinates, self.noseindex,
+                                             distribution, numpoints,
+                                             curvature_factor)
+        self.find_nose()
+        self.normalize()
+
+    def get_curvature(self):
+        return resample.curvature(self.coordinates)
+
+    def get_geometry(self):
+        """
+        geometric properties of all airfoils as a structured array with one
+        row per airfoil, see: airfoil.geometry.analyze
+        """
+        return geometry.analyze(self.coordinates, self.noseindex)
+
+    def find_nose(self, method="max-curvature"):
+        """
+        set the noseindex of every airfoil to the point with the max.
+        curvature ("max-curvature") or the min. x-value ("min-x-value")
+        """
+        self.noseindex = leading_edge.nose_index(self.coordinates, method)
+
+    def get_leading_edge(self):
+        """
+        returns the leading edge points (located between the coordinates)
+        and their fractional indices, see: airfoil.leading_edge.leading_edge
+        """
+        return leading_edge.leading_edge(self.coordinates, self.noseindex)
+
+    def normalize(self, noseindex=None):
+        """
+        Normalize all airfoils (in place):
+            *Put the nose back to (0,0)
+            *De-rotate airfoil
+            *Reset its length to 1
+        returns the applied transformation (see airfoil.transform)
+        """
+        if noseindex is None:
+            noseindex = self.noseindex
+        normalization = transform.normalization(self.coordinates, noseindex)
+        normalization.apply(self.coordinates, out=self.coordinates)
+        self.coordinates[:, -1] = self.coordinates[:, 0]
+        mark_modified(self.coordinates)
+        return normalization
+
+    def move_nose(self):
+        """
+        moves the nose coordinates to the leading edges located between the
+        coordinates (see get_leading_edge) and normalizes the airfoils
+        """
+        rows = np.arange(len(self))
+        self.coordinates[rows, self.noseindex] = self.get_leading_edge()[0]
+        mark_modified(self.coordinates)
+        return self.normalize()
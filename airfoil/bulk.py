@@ -0,0 +1,175 @@
+import os
+import zipfile
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+from airfoil import dat
+from airfoil.airfoil import Airfoil
+from airfoil.batch import AirfoilBatch
+
+# import (and export) of many airfoils, eg. a local mirror of the
+# uiuc airfoil database stored as a directory or zip-archive
+
+
+def _name_from_path(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def iter_sources(path, extension=(".dat", ".csv")):
+    """
+    yields (name, filename, text) for all files with the extension (or one
+    of the extensions) in a directory (recursive) or a zip-archive. text is
+    only read for members of zip-archives (None for files in directories).
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for member in sorted(archive.namelist()):
+                if member.lower().endswith(extension):
+                    text = archive.read(member).decode("utf-8", errors="replace")
+                    yield _name_from_path(member), member, text
+    else:
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for fn in sorted(files):
+                if fn.lower().endswith(extension):
+                    yield _name_from_path(fn), os.path.join(root, fn), None
+
+
+def _load(source, numpoints=None):
+    """
+    parse one source of iter_sources (executed by the workers)
+    returns (name, coordinates) or (name, exception)
+    """
+    name, filename, text = source
+    try:
+        if text is None:
+            with open(filename, "r", errors="replace") as p_file:
+                text = p_file.read()
+        coordinates = dat.parse_dat(text)[1]
+        if numpoints:
+            airfoil = Airfoil(coordinates, name)
+            airfoil.numpoints = numpoints
+            coordinates = airfoil.coordinates
+        return name, coordinates
+    except Exception as e:
+        return name, e
+
+
+def _load_all(path, numpoints=None, workers=None, use_processes=False, chunksize=16):
+    """yields (name, coordinates or exception) in the order of iter_sources"""
+    sources = iter_sources(path)
+    if not workers:
+        for source in sources:
+            yield _load(source, numpoints)
+        return
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        kwargs = {"chunksize": chunksize} if use_processes else {}
+        for result in executor.map(_load, sources, repeat(numpoints), **kwargs):
+            yield result
+
+
+def import_airfoils(path, workers=None, use_processes=False, skip_errors=True):
+    """
+    generator which yields the airfoils of all '.dat' files (selig or
+    lednicer format) and '.csv' files (see airfoil.dat.format_dat) in a
+    directory or a zip-archive
+    workers: size of the thread- (or process-) pool which parses the files
+    skip_errors: files which can't be parsed are skipped, otherwise the
+                 error is raised
+    """
+    for name, coordinates in _load_all(path, None, workers, use_processes):
+        if isinstance(coordinates, Exception):
+            if skip_errors:
+                continue
+            raise coordinates
+        yield Airfoil(coordinates, name)
+
+
+def import_batches(path, numpoints=100, batch_size=1000, workers=None,
+                   use_processes=False, skip_errors=True):
+    """
+    generator which yields AirfoilBatch objects with max. batch_size airfoils.
+    every airfoil is resampled to the same number of points (see
+    Airfoil.numpoints) and copied into the contiguous batch-array.
+    """
+    num_coords = numpoints - numpoints % 2 + 1
+    coordinates = np.empty((batch_size, num_coords, 2))
+    names = []
+    for name, coords in _load_all(path, numpoints, workers, use_processes):
+        if isinstance(coords, Exception):
+            if skip_errors:
+                continue
+            raise coords
+        coordinates[len(names)] = coords
+        names.append(name)
+        if len(names) == batch_size:
+            yield AirfoilBatch(coordinates, names)
+            coordinates = np.empty((batch_size, num_coords, 2))
+            names = []
+    if names:
+        yield AirfoilBatch(coordinates[:len(names)], names)
+
+
+EXTENSIONS = {
+    "selig": ".dat",
+    "lednicer": ".dat",
+    "xfoil": ".dat",
+    "csv": ".csv"
+}
+
+
+def _filenames(names, directory, extension):
+    """unique file names for the airfoil names"""
+    filenames = []
+    used = set()
+    for name in names:
+        base = str(name).replace(os.sep, "_") or "airfoil"
+        filename, i = base, 1
+        while filename in used:
+            filename = "{}_{}".format(base, i)
+            i += 1
+        used.add(filename)
+        filenames.append(os.path.join(directory, filename + extension))
+    return filenames
+
+
+def _export(args):
+    filename, name, coordinates, file_format, precision, noseindex = args
+    with open(filename, "w") as out:
+        out.write(dat.format_dat(name, coordinates, file_format, precision, noseindex))
+    return filename
+
+
+def export_airfoils(airfoils, path, file_format="selig", precision=None, workers=None):
+    """
+    export many airfoils (list, generator, AirfoilBatch, AirfoilLibrary)
+    path: directory for the text formats, file name for the "library" format
+    file_format: "selig", "lednicer", "xfoil", "csv" or "library"
+    workers: size of the thread-pool which formats and writes the files
+    returns the list of written files
+    """
+    if file_format == "library":
+        from airfoil.library import AirfoilLibrary
+        AirfoilLibrary.write(path, airfoils)
+        return [path]
+    if file_format not in EXTENSIONS:
+        raise ValueError("unknown file format: {}".format(file_format))
+    os.makedirs(path, exist_ok=True)
+    if isinstance(airfoils, AirfoilBatch):
+        names = airfoils.names
+        coordinates = airfoils.coordinates
+        noseindex = airfoils.noseindex
+    else:
+        airfoils = list(airfoils)
+        names = [airfoil.name for airfoil in airfoils]
+        coordinates = [airfoil.coordinates for airfoil in airfoils]
+        noseindex = [airfoil.noseindex for airfoil in airfoils]
+    filenames = _filenames(names, path, EXTENSIONS[file_format])
+    jobs = zip(filenames, names, coordinates, repeat(file_format), repeat(precision), noseindex)
+    if not workers:
+        return [_export(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_export, jobs))
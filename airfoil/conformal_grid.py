@@ -0,0 +1,242 @@
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from airfoil import conformal_mapping
+from airfoil.batch import AirfoilBatch
+
+# precomputed coordinates of conformal-mapping airfoils on a regular grid of
+# parameters. New parameters are served by multilinear interpolation with an
+# error estimate, the exact mapping is used if the estimate exceeds the
+# tolerance (or outside of the grid).
+# The coordinates are the mapped circle points (constant circle angle), the
+# leading edge (point furthest from the trailing edge) is moved to (0, 0) and
+# the trailing edge to (1, 0). This parameterization is smooth in the
+# parameters, which makes the interpolation possible.
+
+FAMILIES = {
+    "joukowsky": ("midpoint_real", "midpoint_imag"),
+    "trefftz_kutta": ("midpoint_real", "midpoint_imag", "tau"),
+    "vandevooren": ("tau", "epsilon")
+}
+
+# parameter ranges of the default grids (eg. used by the FreeCAD proxies)
+DEFAULT_AXES = {
+    "joukowsky": (np.linspace(-0.3, 0., 31), np.linspace(0., 0.3, 31)),
+    "trefftz_kutta": (np.linspace(-0.3, 0., 31), np.linspace(0., 0.3, 31),
+                      np.linspace(0., 0.3, 7)),
+    "vandevooren": (np.linspace(0., 0.3, 31), np.linspace(0., 0.3, 31))
+}
+
+
+def _mapping(family, params):
+    """
+    returns the mapping for the params (shape (num_parameters,) or batched
+    (N, num_parameters))
+    """
+    params = np.asarray(params, dtype=float)
+    if family == "joukowsky":
+        return conformal_mapping.JoukowskyAirfoil(params[..., 0] + 1j * params[..., 1])
+    elif family == "trefftz_kutta":
+        return conformal_mapping.TrefftzKuttaAirfoil(params[..., 0] + 1j * params[..., 1],
+                                                     params[..., 2])
+    elif family == "vandevooren":
+        return conformal_mapping.VanDeVoorenAirfoil(params[..., 0], params[..., 1])
+    raise ValueError("unknown family: {}".format(family))
+
+
+def exact_coordinates(family, params, numpoints=101):
+    """
+    normalized coordinates of the airfoils of a family
+    params: array with shape (N, num_parameters), see FAMILIES
+    returns an array with shape (N, numpoints, 2)
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    mapping = _mapping(family, params)
+    leading_edge, trailing_edge = mapping.chord_line(1001)
+    z = (mapping.coordinates(numpoints) - leading_edge) / (trailing_edge - leading_edge)
+    return np.stack([z.real, z.imag], axis=-1)
+
+
+class ConformalGrid(object):
+    """
+    Coordinates of a conformal-mapping family tabulated on a regular grid
+    axes: one increasing array of values per parameter of the family
+    coordinates: array with shape (len(axes[0]), ..., len(axes[-1]), numpoints, 2)
+    """
+
+    def __init__(self, family, axes, coordinates):
+        if family not in FAMILIES:
+            raise ValueError("unknown family: {}".format(family))
+        self.family = family
+        self.axes = [np.asarray(axis, dtype=float) for axis in axes]
+        self.coordinates = np.asarray(coordinates)
+        assert len(self.axes) == len(FAMILIES[family])
+        assert self.coordinates.shape[:-2] == tuple(len(axis) for axis in self.axes)
+        self.node_error = self._node_error()
+
+    @classmethod
+    def compute(cls, family, axes=None, numpoints=101, dtype=float):
+        """
+        tabulate the coordinates of all parameter combinations of the axes
+        (the mapping is evaluated for all of them at once)
+        axes: default: DEFAULT_AXES of the family
+        dtype: eg. np.float32 for a more compact table
+        """
+        axes = DEFAULT_AXES[family] if axes is None else axes
+        axes = [np.asarray(axis, dtype=float) for axis in axes]
+        params = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(axes))
+        coordinates = exact_coordinates(family, params, numpoints).astype(dtype)
+        return cls(family, axes, coordinates.reshape(tuple(map(len, axes)) + (numpoints, 2)))
+
+    def save(self, path):
+        """store the grid in a (compressed) numpy file"""
+        np.savez_compressed(path, family=self.family, coordinates=self.coordinates,
+                            **{"axis_{}".format(i): axis for i, axis in enumerate(self.axes)})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            family = str(data["family"])
+            axes = [data["axis_{}".format(i)] for i in range(len(FAMILIES[family]))]
+            return cls(family, axes, data["coordinates"])
+
+    @property
+    def numpoints(self):
+        return self.coordinates.shape[-2]
+
+    @property
+    def parameter_names(self):
+        return FAMILIES[self.family]
+
+    def _node_error(self):
+        """
+        estimate of the error of the linear interpolation next to every node:
+        sum over the axes of 1/8 * max. second difference of the coordinates
+        """
+        coordinates = self.coordinates.astype(float)
+        error = np.zeros(coordinates.shape[:-2])
+        for axis in range(len(self.axes)):
+            if coordinates.shape[axis] < 3:
+                continue
+            second = np.diff(coordinates, n=2, axis=axis)
+            second = np.max(np.linalg.norm(second, axis=-1), axis=-1)
+            # the border nodes use the value of their neighbour
+            second = np.concatenate([np.take(second, [0], axis=axis), second,
+                                     np.take(second, [-1], axis=axis)], axis=axis)
+            error += second / 8
+        return error
+
+    def _cells(self, params):
+        """returns the lower node index and the weight of every parameter"""
+        indices, weights = [], []
+        inside = np.ones(len(params), dtype=bool)
+        for axis, values in zip(self.axes, params.T):
+            i = np.clip(np.searchsorted(axis, values, side="right") - 1, 0, len(axis) - 2)
+            indices.append(i)
+            weights.append((values - axis[i]) / (axis[i + 1] - axis[i]))
+            inside &= (values >= axis[0]) & (values <= axis[-1])
+        return indices, weights, inside
+
+    def interpolate(self, params):
+        """
+        multilinear interpolation of the coordinates
+        params: array with shape (N, num_parameters)
+        returns: coordinates (N, numpoints, 2), error estimate (N,) (inf outside
+                 of the grid)
+        """
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        indices, weights, inside = self._cells(params)
+        coordinates = np.zeros((len(params), self.numpoints, 2))
+        error = np.zeros(len(params))
+        for corner in itertools.product([0, 1], repeat=len(self.axes)):
+            node = tuple(i + c for i, c in zip(indices, corner))
+            weight = np.prod([w if c else 1 - w for w, c in zip(weights, corner)], axis=0)
+            coordinates += weight[:, None, None] * self.coordinates[node]
+            error = np.maximum(error, self.node_error[node])
+        error[~inside] = np.inf
+        return coordinates, error
+
+    def get_coordinates(self, params, tolerance=1e-4):
+        """
+        coordinates for the params (N, num_parameters), interpolated if the
+        error estimate is below the tolerance, computed exactly otherwise
+        """
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        coordinates, error = self.interpolate(params)
+        exact = error > tolerance
+        if np.any(exact):
+            coordinates[exact] = exact_coordinates(self.family, params[exact], self.numpoints)
+        return coordinates
+
+    def get_batch(self, params, tolerance=1e-4):
+        """AirfoilBatch of the airfoils for the params (N, num_parameters)"""
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        names = [self.family + "_" + "_".join("{}={}".format(name, value) for name, value in
+                                              zip(self.parameter_names, row))
+                 for row in params.tolist()]
+        return AirfoilBatch(self.get_coordinates(params, tolerance), names)
+
+    def get_airfoil(self, *params, tolerance=1e-4):
+        """
+        the airfoil for one set of parameters, eg.:
+            grid.get_airfoil(midpoint_real, midpoint_imag, tau)
+        """
+        params = np.array([params], dtype=float)
+        airfoil = self.get_batch(params, tolerance)[0]
+        airfoil.coordinates = np.array(airfoil.coordinates)
+        airfoil.conformal_mapping = _mapping(self.family, params[0])
+        return airfoil
+
+
+# default grids in memory, the least recently used grid is dropped first
+MAX_DEFAULT_GRIDS = 4
+_DEFAULT_GRIDS = OrderedDict()
+_PENDING_GRIDS = {}
+_GRID_LOCK = threading.Lock()
+_GRID_EXECUTOR = None  # created on the first request
+
+
+def _compute_default_grid(key):
+    try:
+        grid = ConformalGrid.compute(key[0], numpoints=key[1])
+        with _GRID_LOCK:
+            _DEFAULT_GRIDS[key] = grid
+            while len(_DEFAULT_GRIDS) > MAX_DEFAULT_GRIDS:
+                _DEFAULT_GRIDS.popitem(last=False)
+        return grid
+    finally:
+        with _GRID_LOCK:
+            _PENDING_GRIDS.pop(key, None)
+
+
+def default_grid(family, numpoints=101, wait=True):
+    """
+    returns the grid of the family with the DEFAULT_AXES. It is computed on
+    the first request (by one background thread, so requests of the same
+    grid share the computation) and the last MAX_DEFAULT_GRIDS grids are
+    kept in memory.
+    wait=False doesn't block: None is returned if the grid is not computed
+    yet (eg. interactive tools can use the exact mapping until the grid is
+    ready)
+    """
+    global _GRID_EXECUTOR
+    if family not in FAMILIES:
+        raise ValueError("unknown family: {}".format(family))
+    key = (family, numpoints)
+    with _GRID_LOCK:
+        if key in _DEFAULT_GRIDS:
+            _DEFAULT_GRIDS.move_to_end(key)
+            return _DEFAULT_GRIDS[key]
+        future = _PENDING_GRIDS.get(key)
+        if future is None:
+            if _GRID_EXECUTOR is None:
+                _GRID_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+            future = _PENDING_GRIDS[key] = _GRID_EXECUTOR.submit(_compute_default_grid, key)
+    if not wait:
+        return None
+    return future.result()
+
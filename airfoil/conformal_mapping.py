@@ -1,6 +1,13 @@
 import numpy as np
 
 
+def _batch_axis(value):
+    '''scalars are returned unchanged, arrays of parameters (eg. a batch of
+       midpoints) get an additional last axis to broadcast with the points'''
+    value = np.asarray(value)
+    return value[..., None] if value.ndim else value[()]
+
+
 class JoukowskyAirfoil(object):
     '''the joukowsky airfoil is created by applying the joukowsky transformation
        1 + 1 / z at a circle which passes 1 + 0j and has the center point in the
@@ -14,19 +21,17 @@ class JoukowskyAirfoil(object):
     def circle(self, num=100):
         '''A circle with center midpoint and passing 0j + 1'''
 
-        def circle_val(phi):
-            return self.midpoint + self.radius * np.e ** ((phi - self.beta) * 1j)
-
-        return np.array([circle_val(phi) for phi in np.linspace(0, 2 * np.pi, num)])
+        phi = np.linspace(0, 2 * np.pi, num)
+        return _batch_axis(self.midpoint) + self.radius * np.exp((phi - self.beta) * 1j)
 
     @property
     def radius(self):
-        return abs(1 - self.midpoint)
+        return abs(1 - _batch_axis(self.midpoint))
 
     @property
     def beta(self):
         '''the angle between 0j + 1, the midpoint and a horizontal line'''
-        return np.arcsin(self.midpoint.imag / self.radius)
+        return np.arcsin(np.imag(_batch_axis(self.midpoint)) / self.radius)
 
     def zeta(self, z):
         '''maps a complex number z to the zeta-plane'''
@@ -35,59 +40,146 @@ class JoukowskyAirfoil(object):
     def dz_dzeta(self, z):
         '''d_z / d_zeta'''
         dzeta_dz = (1 - 1 / z**2)
-        return 1. if dzeta_dz == 0 else 1 / dzeta_dz
+        dzeta_dz = np.where(dzeta_dz == 0, 1., dzeta_dz)
+        return (1 / dzeta_dz)[()]
 
     def z(self, zeta):
         '''maps a complex number zeta to the z-plane'''
-        z = (zeta + np.sqrt(zeta ** 2 - 4)) / 2
+        root = np.sqrt(zeta ** 2 - 4 + 0j)
+        z = (zeta + root) / 2
         # if the point is inside the object
-        mid = self.midpoint.imag / (1 - self.midpoint.real) * 1j
-        if abs(z - mid) < abs(mid + 1):
-            z = (zeta - np.sqrt(zeta ** 2 - 4)) / 2
-        return z
+        midpoint = _batch_axis(self.midpoint)
+        mid = np.imag(midpoint) / (1 - np.real(midpoint)) * 1j
+        inside = abs(z - mid) < abs(mid + 1)
+        return np.where(inside, (zeta - root) / 2, z)[()]
 
     def coordinates(self, num=100):
         '''maps the z-circle to the zeta-plane which results in a joukowsky airfoil'''
-        return np.array(list(map(self.zeta, self.circle(num))))
+        return self.zeta(self.circle(num))
+
+    def _alpha_axis(self, alpha):
+        '''scalars are returned unchanged, an array of angles of attack gets
+           additional axes to broadcast with the points (and the parameters).
+           The results for alpha arrays have the shape (n_alpha, ..., n_points).'''
+        alpha = np.asarray(alpha, dtype=float)
+        if not alpha.ndim:
+            return alpha[()]
+        return alpha.reshape(alpha.shape + (1,) * max(np.ndim(self.radius), 1))
 
     def gamma(self, alpha):
         '''return the strength of the circulation to satisfy the kutta-condition
-           for a given angle of attack alpha'''
+           for a given angle of attack alpha (scalar or array)'''
+        return self._gamma(self._alpha_axis(alpha))
+
+    def _gamma(self, alpha):
         return 4 * np.pi * self.radius * np.sin(alpha + self.beta)
 
     def potential(self, z, alpha):
         '''return the potential of any point in the complex z-plane for a given
            angle of attack alpha'''
-        W_inf = np.e ** (-1j * alpha) * (z - self.midpoint)
-        W_dip = self.radius ** 2 * np.e ** (1j * alpha) * (1 / (z - self.midpoint))
-        W_vort = 1j * self.gamma(alpha) / 2 / np.pi * np.log(z - self.midpoint)
+        midpoint = _batch_axis(self.midpoint)
+        alpha = self._alpha_axis(alpha)
+        W_inf = np.e ** (-1j * alpha) * (z - midpoint)
+        W_dip = self.radius ** 2 * np.e ** (1j * alpha) * (1 / (z - midpoint))
+        W_vort = 1j * self._gamma(alpha) / 2 / np.pi * np.log(z - midpoint)
         return W_inf + W_dip + W_vort
 
     def z_velocity(self, z, alpha):
         '''return the complex velocity of any point in the complex z-plane for
            a given angle of attack alpha'''
+        midpoint = _batch_axis(self.midpoint)
+        alpha = self._alpha_axis(alpha)
         Q_inf = np.e ** (-1j * alpha)
-        Q_dip = - self.radius ** 2 * np.e ** (1j * alpha) * (1 / ((z - self.midpoint) ** 2))
-        Q_vort = 1j * self.gamma(alpha) / (2 * np.pi) / (z - self.midpoint)
+        Q_dip = - self.radius ** 2 * np.e ** (1j * alpha) * (1 / ((z - midpoint) ** 2))
+        Q_vort = 1j * self._gamma(alpha) / (2 * np.pi) / (z - midpoint)
         return (Q_inf + Q_dip + Q_vort)
 
     def velocity(self, z, alpha):
         '''return the complex velocity mapped to the zeta-plane of a point in the
            z-plane for a given angle of attack alpha'''
         min_size = 0.1 * 10 ** (-10)
-        if z > 1 - min_size and z < 1  + min_size:
-            return (np.e ** (-1j * alpha) * np.e ** (1j * 2 * self.beta) *
-                   np.cos(alpha + self.beta) / self.radius)
-        return self.z_velocity(z, alpha) * self.dz_dzeta(z)
+        trailing_edge = abs(z - 1) < min_size
+        a = self._alpha_axis(alpha)
+        trailing_edge_velocity = (np.e ** (-1j * a) * np.e ** (1j * 2 * self.beta) *
+                                  np.cos(a + self.beta) / self.radius)
+        # the singular values at the trailing edge are replaced by the mask
+        with np.errstate(divide="ignore", invalid="ignore"):
+            velocity = self.z_velocity(z, alpha) * self.dz_dzeta(z)
+        return np.where(trailing_edge, trailing_edge_velocity, velocity)[()]
 
     def surface_velocity(self, alpha, num=100):
         '''return the complex velocity for a given angle of attack alpha'''
-        return np.array([self.velocity(z, alpha) for z in self.circle(num)])
+        return self.velocity(self.circle(num), alpha)
 
     def surface_cp(self, alpha, num=100):
         '''return the presure coeficient cp on the surface of the airfoil
-           for a given angle of attack alpha'''
-        return [1 - (v.real ** 2 + v.imag ** 2) for v in self.surface_velocity(alpha, num)]
+           for a given angle of attack alpha (an array of n_alpha angles results
+           in a (n_alpha, num) matrix)'''
+        v = self.surface_velocity(alpha, num)
+        return 1 - (v.real ** 2 + v.imag ** 2)
+
+    def chord_line(self, num=4001):
+        '''return the leading edge (the point of the surface furthest from the
+           trailing edge) and the trailing edge in the zeta-plane. The leading
+           edge is refined between the num points of the circle by a parabola.'''
+        phi = np.linspace(0, 2 * np.pi, num)
+        surface = self.coordinates(num)
+        trailing_edge = surface[..., :1]
+        distance = abs(surface - trailing_edge)
+        i = np.clip(np.argmax(distance, axis=-1), 1, num - 2)[..., None]
+        d0, d1, d2 = [np.take_along_axis(distance, j, axis=-1) for j in (i - 1, i, i + 1)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shift = np.nan_to_num((d0 - d2) / (2 * (d0 - 2 * d1 + d2)))
+        phi_le = phi[i] + np.clip(shift, -1, 1) * (phi[1] - phi[0])
+        circle_point = _batch_axis(self.midpoint) + self.radius * np.exp((phi_le - self.beta) * 1j)
+        leading_edge = self.zeta(circle_point)
+        if not np.ndim(self.radius):
+            return leading_edge[0], trailing_edge[0]
+        return leading_edge, trailing_edge
+
+    @property
+    def chord(self):
+        leading_edge, trailing_edge = self.chord_line()
+        return abs(trailing_edge - leading_edge)
+
+    def _forces(self, alpha, num=256):
+        '''blasius theorem: returns the complex force X + iY and the moment
+           around the origin (counterclockwise positive) for the density 1 and
+           the free-stream velocity 1. The contour integrals are evaluated on a
+           circle with 2 * radius in the z-plane (periodic trapezoidal rule).'''
+        phi = np.linspace(0, 2 * np.pi, num, endpoint=False)
+        z = _batch_axis(self.midpoint) + 2 * self.radius * np.exp(1j * phi)
+        dz = 1j * (z - _batch_axis(self.midpoint)) * (2 * np.pi / num)
+        w = self.z_velocity(z, alpha)
+        dz_dzeta = self.dz_dzeta(z)
+        # w(zeta)^2 dzeta = w(z)^2 dz_dzeta dz
+        integrand = w ** 2 * dz_dzeta * dz
+        force = np.conj(1j / 2 * np.sum(integrand, axis=-1))
+        moment = np.real(-1 / 2 * np.sum(self.zeta(z) * integrand, axis=-1))
+        return force, moment
+
+    def cl(self, alpha):
+        '''analytic lift coefficient (kutta-joukowsky) for the angle of attack
+           alpha (scalar or array) measured against the real axis'''
+        cl = 2 * self.gamma(alpha) / self.chord
+        return cl[..., 0] if np.ndim(cl) else cl
+
+    def cm(self, alpha, reference=None):
+        '''analytic moment coefficient (nose up positive) around the reference
+           point (default: quarter chord point) for the angle of attack alpha
+           (scalar or array) measured against the real axis'''
+        leading_edge, trailing_edge = self.chord_line()
+        chord = abs(trailing_edge - leading_edge)
+        if reference is None:
+            reference = leading_edge + (trailing_edge - leading_edge) / 4
+        if np.ndim(chord):
+            leading_edge, trailing_edge = leading_edge[..., 0], trailing_edge[..., 0]
+            reference, chord = np.asarray(reference)[..., 0], chord[..., 0]
+        force, moment = self._forces(alpha)
+        # moment around the reference point
+        moment -= reference.real * force.imag - reference.imag * force.real
+        # the leading edge is on the left: nose up is clockwise
+        return -moment / (chord ** 2 / 2)
 
     def x(self, num=100):
         a = self.coordinates(num)
@@ -104,27 +196,29 @@ class VanDeVoorenAirfoil(JoukowskyAirfoil):
     @property
     def k(self):
         '''SA p.138 6.66'''
-        return 2 - self.tau / np.pi
+        return 2 - _batch_axis(self.tau) / np.pi
 
     @property
     def radius(self):
         '''LSA p.138 (6.65)'''
-        return 2 * self.chord_length * (1 + self.epsilon) ** (self.k - 1) * 2 ** (-self.k)
+        epsilon = _batch_axis(self.epsilon)
+        return 2 * self.chord_length * (1 + epsilon) ** (self.k - 1) * 2 ** (-self.k)
 
     def zeta(self, z):
         '''LSA p.137 (6.62)'''
         a = (z - self.radius) ** self.k
-        b = (z - self.radius * self.epsilon) ** (self.k - 1)
+        b = (z - self.radius * _batch_axis(self.epsilon)) ** (self.k - 1)
         return a / b + self.chord_length
 
     def dz_dzeta(self, z):
         k = self.k
-        e = self.epsilon
+        e = _batch_axis(self.epsilon)
         a = self.radius
-        dzeta_dz = k*(-a + z)**(-1 + k)*(-(a*e) + z)**(1 - k) +\
-            ((1 - k)*(-a + z)**k)/(-(a*e) + z)**k
-        dzeta_dz = 0.00000001 if dzeta_dz == 0 else dzeta_dz
-        return 1 / dzeta_dz
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dzeta_dz = k*(-a + z)**(-1 + k)*(-(a*e) + z)**(1 - k) +\
+                ((1 - k)*(-a + z)**k)/(-(a*e) + z)**k
+        dzeta_dz = np.where(dzeta_dz == 0, 0.00000001, dzeta_dz)
+        return (1 / dzeta_dz)[()]
 
     def z(self, zeta):
         '''not invertable'''
@@ -141,7 +235,7 @@ class TrefftzKuttaAirfoil(JoukowskyAirfoil):
 
     @property
     def n(self):
-        return 2 - self.tau / np.pi
+        return 2 - _batch_axis(self.tau) / np.pi
 
     def zeta(self, z):
         n = self.n
@@ -153,16 +247,19 @@ class TrefftzKuttaAirfoil(JoukowskyAirfoil):
         n = self.n
         a = (1 + 1 / z) ** n
         b = (1 - 1 / z) ** n
-        if z ** 2 == 1 or a - b == 0:
-            return 0
-        dzeta_dz = 4 * n ** 2 / (z ** 2 - 1) * (a * b) / (a - b) ** 2
-        dzeta_dz = 0.00000001 if dzeta_dz == 0 else dzeta_dz
-        return 1 / dzeta_dz
+        singular = (z ** 2 == 1) | (a - b == 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dzeta_dz = 4 * n ** 2 / (z ** 2 - 1) * (a * b) / (a - b) ** 2
+            dzeta_dz = np.where(dzeta_dz == 0, 0.00000001, dzeta_dz)
+            dz_dzeta = 1 / dzeta_dz
+        return np.where(singular, 0, dz_dzeta)[()]
+
+    def dz_dzeta(self, z):
+        return self.ddz_dzetaz_dzeta(z)
 
     def velocity(self, z, alpha):
         '''return the complex velocity mapped to the zeta-plane of a point in the
            z-plane for a given angle of attack alpha'''
-        min_size = 0.1 * 10 ** (-10)
         return self.z_velocity(z, alpha) * self.dz_dzeta(z)
 
     def z(self, zeta):
@@ -0,0 +1,155 @@
+import numpy as np
+
+# parsing of airfoil '.dat' files
+# selig:    name, coordinates from the trailing edge over the upper side to the
+#           leading edge and over the lower side back to the trailing edge
+# lednicer: name, number of upper and lower points, upper side and lower side
+#           each from the leading edge to the trailing edge
+# csv:      header x,y and comma-separated coordinates in selig order
+
+
+def _parse_numbers(lines):
+    """
+    returns the numbers of the lines as one float-array or None if any
+    line contains a non-numeric token
+    """
+    try:
+        return np.array(" ".join(lines).split(), dtype=float)
+    except ValueError:
+        return None
+
+
+def _is_number_line(line):
+    tokens = line.split()
+    if len(tokens) != 2:
+        return False
+    try:
+        float(tokens[0])
+        float(tokens[1])
+    except ValueError:
+        return False
+    return True
+
+
+def detect_format(lines):
+    """
+    returns "csv" if the coordinates are separated by commas, "lednicer" if
+    the first data-line contains the number of upper and lower points,
+    otherwise "selig"
+    """
+    data_lines = [line for line in lines if line.strip()]
+    if data_lines and "," in data_lines[-1]:
+        return "csv"
+    if len(data_lines) < 2:
+        return "selig"
+    if not _is_number_line(data_lines[0]):
+        data_lines = data_lines[1:]
+    values = data_lines[0].split()
+    if _is_number_line(data_lines[0]):
+        num_upper, num_lower = float(values[0]), float(values[1])
+        if num_upper > 1 and num_lower > 1 and num_upper.is_integer() and \
+                num_lower.is_integer():
+            return "lednicer"
+    return "selig"
+
+
+def lednicer_to_selig(coordinates, num_upper, num_lower):
+    """
+    converts lednicer ordered coordinates (upper and lower side from the
+    leading edge to the trailing edge) to the selig order
+    """
+    upper = coordinates[:num_upper]
+    lower = coordinates[num_upper:num_upper + num_lower]
+    if np.allclose(upper[0], lower[0]):
+        lower = lower[1:]
+    return np.concatenate([upper[::-1], lower])
+
+
+def parse_dat(text, file_format=None):
+    """
+    parse the content of a '.dat' file (string or iterable of lines)
+    file_format: "selig", "lednicer", "csv" or None (auto-detect)
+    returns: name (first line or None, csv: None), coordinates in selig order
+    """
+    if isinstance(text, str):
+        lines = text.splitlines()
+    else:
+        lines = [line.rstrip("\n") for line in text]
+    lines = [line for line in lines if line.strip()]
+    if file_format == "csv" or (file_format is None and detect_format(lines) == "csv"):
+        file_format = "csv"
+        lines = [line.replace(",", " ") for line in lines]
+    name = None
+    if lines and not _is_number_line(lines[0]):
+        # the header of a csv file is not a name
+        name = None if file_format == "csv" else lines[0].strip()
+        lines = lines[1:]
+    file_format = file_format or detect_format(lines)
+
+    if file_format == "lednicer":
+        num_upper, num_lower = [int(float(i)) for i in lines[0].split()]
+        lines = lines[1:]
+
+    values = _parse_numbers(lines)
+    if values is None or len(values) % 2:
+        # slow path: only use lines with two numbers
+        coordinates = np.array([line.split() for line in lines if _is_number_line(line)],
+                               dtype=float)
+    else:
+        coordinates = values.reshape(-1, 2)
+    if coordinates.ndim != 2 or len(coordinates) < 3:
+        raise ValueError("no airfoil coordinates found")
+
+    if file_format == "lednicer":
+        coordinates = lednicer_to_selig(coordinates, num_upper, num_lower)
+    return name, coordinates
+
+
+def _format_coordinates(coordinates, precision=None, delimiter="\t"):
+    """
+    returns the coordinates as lines of text. Without precision the shortest
+    representation of the floats is used (like str).
+    All values are formatted with one %-operation of a template which
+    contains a line for every point.
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    if not len(coordinates):
+        return []
+    value = "%r" if precision is None else "%.{}f".format(int(precision))
+    line = value + delimiter.replace("%", "%%") + value
+    text = "\n".join([line] * len(coordinates)) % tuple(coordinates.ravel().tolist())
+    return text.split("\n")
+
+
+def format_dat(name, coordinates, file_format="selig", precision=None, noseindex=None):
+    """
+    returns the text of an airfoil file
+    file_format:
+        "selig": name and coordinates
+        "lednicer": name, number of points per side, upper and lower side
+                    from the leading to the trailing edge (needs noseindex)
+        "xfoil": like selig, with fixed precision (default 7 digits)
+        "csv": header x,y and comma-separated coordinates
+    """
+    coordinates = np.asarray(coordinates)
+    if file_format == "selig":
+        lines = ([str(name)] if name else []) + _format_coordinates(coordinates, precision)
+        return "\n".join(lines)
+    elif file_format == "xfoil":
+        lines = [str(name or "airfoil")]
+        lines += [" " + line for line in _format_coordinates(
+            coordinates, 7 if precision is None else precision, "  ")]
+        return "\n".join(lines) + "\n"
+    elif file_format == "lednicer":
+        if noseindex is None:
+            noseindex = int(np.argmin(coordinates[:, 0]))
+        upper = coordinates[:noseindex + 1][::-1]
+        lower = coordinates[noseindex:]
+        lines = [str(name or "airfoil"),
+                 "{}. {}.".format(len(upper), len(lower)), ""]
+        lines += _format_coordinates(upper, precision, " ") + [""]
+        lines += _format_coordinates(lower, precision, " ")
+        return "\n".join(lines) + "\n"
+    elif file_format == "csv":
+        return "\n".join(["x,y"] + _format_coordinates(coordinates, precision, ",")) + "\n"
+    raise ValueError("unknown file format: {}".format(file_format))
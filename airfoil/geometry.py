@@ -0,0 +1,177 @@
+import numpy as np
+
+from airfoil import resample
+
+# derived geometry of airfoils
+# all functions work on a single airfoil (coordinates with shape (P, 2)) or on
+# a batch of airfoils with the same number of points (shape (N, P, 2))
+
+
+def panels(coordinates):
+    """
+    return the start- and end-point of the panels between the coordinates
+    (shape (P - 1, 2, 2) or (N, P - 1, 2, 2))
+    """
+    coordinates = np.asarray(coordinates)
+    return np.stack([coordinates[..., :-1, :], coordinates[..., 1:, :]], axis=-2)
+
+
+def panel_lengths(coordinates):
+    """return the length of the panels (shape (P - 1,) or (N, P - 1))"""
+    return np.linalg.norm(np.diff(np.asarray(coordinates), axis=-2), axis=-1)
+
+
+def tangents(coordinates):
+    """
+    return the unit tangents of the panels in the direction of the
+    coordinates (shape (P - 1, 2) or (N, P - 1, 2))
+    """
+    diff = np.diff(np.asarray(coordinates), axis=-2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nan_to_num(diff / np.linalg.norm(diff, axis=-1)[..., None])
+
+
+def normals(coordinates):
+    """
+    return the unit normals of the panels. For coordinates ordered from the
+    trailing edge over the upper side to the lower side the normals point
+    outwards (shape (P - 1, 2) or (N, P - 1, 2))
+    """
+    t = tangents(coordinates)
+    return np.stack([t[..., 1], -t[..., 0]], axis=-1)
+
+
+def area(coordinates):
+    """return the enclosed area of the airfoil(s) (shoelace formula)"""
+    coordinates = np.asarray(coordinates)
+    x, y = coordinates[..., 0], coordinates[..., 1]
+    x_next, y_next = np.roll(x, -1, axis=-1), np.roll(y, -1, axis=-1)
+    return abs(np.sum(x * y_next - x_next * y, axis=-1)) / 2
+
+
+def area_jacobian(coordinates):
+    """derivatives of the area with respect to the coordinates (shape like coordinates)"""
+    coordinates = np.asarray(coordinates)
+    x, y = coordinates[..., 0], coordinates[..., 1]
+    x_next, y_next = np.roll(x, -1, axis=-1), np.roll(y, -1, axis=-1)
+    x_prev, y_prev = np.roll(x, 1, axis=-1), np.roll(y, 1, axis=-1)
+    sign = np.sign(np.sum(x * y_next - x_next * y, axis=-1))[..., None]
+    return sign * np.stack([y_next - y_prev, x_prev - x_next], axis=-1) / 2
+
+
+def chord_positions(numpoints=51):
+    """
+    return cosinus distributed positions along the chord between 0 and 1
+    """
+    return (1 - np.cos(np.linspace(0, np.pi, numpoints))) / 2
+
+
+def thickness_camber(coordinates, noseindex, x=None):
+    """
+    return the thickness- and camber-distribution of normalized airfoil(s)
+    at the chord positions x (default: chord_positions())
+    returns: x, thickness, camber (thickness and camber with shape (M,) or (N, M))
+    """
+    x = chord_positions() if x is None else np.asarray(x, dtype=float)
+    signed_x = resample.signed_x(coordinates, noseindex)
+    # upper side: negative signed x-values, lower side: positive
+    targets = np.concatenate([-x[::-1], x])
+    points = resample.interpolate(coordinates, signed_x, targets)
+    y_upper = points[..., :len(x), 1][..., ::-1]
+    y_lower = points[..., len(x):, 1]
+    return x, y_upper - y_lower, (y_upper + y_lower) / 2
+
+
+GEOMETRY_DTYPE = np.dtype([
+    ("max_thickness", float),
+    ("max_thickness_position", float),
+    ("max_camber", float),
+    ("max_camber_position", float),
+    ("leading_edge_radius", float),
+    ("trailing_edge_angle", float),
+    ("trailing_edge_thickness", float),
+    ("area", float)])
+
+
+def _parabolic_max(x, values):
+    """
+    maximum of the values (along the last axis) refined by a parabola
+    through the max. value and its neighbours
+    returns: position, value
+    """
+    i = np.clip(np.argmax(values, axis=-1), 1, values.shape[-1] - 2)[..., None]
+    x0, x1, x2 = x[i - 1], x[i], x[i + 1]
+    y0, y1, y2 = [np.take_along_axis(values, j, axis=-1) for j in (i - 1, i, i + 1)]
+    # newton form of the parabola through the three points
+    d1 = (y1 - y0) / (x1 - x0)
+    d2 = ((y2 - y1) / (x2 - x1) - d1) / (x2 - x0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_max = (x0 + x1) / 2 - d1 / (2 * d2)
+    # no maximum inside the interval: keep the node
+    inside = (d2 < 0) & (x_max >= x0) & (x_max <= x2)
+    x_max = np.where(inside, x_max, x1)
+    y_max = y0 + d1 * (x_max - x0) + d2 * (x_max - x0) * (x_max - x1)
+    return x_max[..., 0], y_max[..., 0]
+
+
+def leading_edge_radius(coordinates, noseindex, num_neighbours=1):
+    """
+    radius of the parabola x(y) fitted (least squares) to the nose point and
+    num_neighbours points on each side
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    single = coordinates.ndim == 2
+    coordinates = coordinates.reshape((-1,) + coordinates.shape[-2:])
+    k = num_neighbours
+    rows = np.arange(len(coordinates))[:, None]
+    center = np.clip(np.broadcast_to(noseindex, (len(coordinates),)),
+                     k, coordinates.shape[1] - 1 - k)
+    points = coordinates[rows, center[:, None] + np.arange(-k, k + 1)]
+    y = points[..., 1] - points[:, k:k + 1, 1]
+    V = np.stack([np.ones_like(y), y, y ** 2], axis=-1)
+    # pinv: degenerated airfoils (eg. zero thickness) result in radius inf
+    c = (np.linalg.pinv(V) @ points[..., 0:1])[..., 0]
+    # curvature of x(y) at its vertex: 2 * c2
+    with np.errstate(divide="ignore"):
+        radius = 1 / (2 * abs(c[:, 2]))
+    return radius[0] if single else radius
+
+
+def analyze(coordinates, noseindex, x=None, trailing_edge_distance=0.02):
+    """
+    geometric properties of normalized airfoil(s) (nose at (0, 0), trailing
+    edge at (1, 0)). The upper and lower side are interpolated once at the
+    chord positions x (default: chord_positions()), the maxima are refined
+    between these positions.
+    trailing_edge_distance: chord distance used for the trailing edge angle
+    returns a structured array (GEOMETRY_DTYPE) with shape () or (N,):
+        max_thickness, max_thickness_position, max_camber,
+        max_camber_position, leading_edge_radius, trailing_edge_angle
+        (in radians), trailing_edge_thickness, area
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    x = chord_positions() if x is None else np.asarray(x, dtype=float)
+    x_te = np.array([1. - trailing_edge_distance, 1.])
+    x, thickness, camber = thickness_camber(coordinates, noseindex,
+                                            np.concatenate([x, x_te]))
+    x, x_te = x[:-2], x[-2:]
+    thickness, thickness_te = thickness[..., :-2], thickness[..., -2:]
+    camber, camber_te = camber[..., :-2], camber[..., -2:]
+
+    result = np.empty(coordinates.shape[:-2], dtype=GEOMETRY_DTYPE)
+    result["max_thickness_position"], result["max_thickness"] = _parabolic_max(x, thickness)
+    # negative camber: the max. of the absolute value (with sign)
+    sign = np.where(camber.max(axis=-1) >= -camber.min(axis=-1), 1., -1.)[..., None]
+    position, value = _parabolic_max(x, camber * sign)
+    result["max_camber_position"] = position
+    result["max_camber"] = value * sign[..., 0]
+    result["leading_edge_radius"] = leading_edge_radius(coordinates, noseindex)
+    # the angle between the upper and the lower side at the trailing edge
+    y_upper = camber_te + thickness_te / 2
+    y_lower = camber_te - thickness_te / 2
+    result["trailing_edge_angle"] = (
+        np.arctan2(y_lower[..., 1] - y_lower[..., 0], trailing_edge_distance) -
+        np.arctan2(y_upper[..., 1] - y_upper[..., 0], trailing_edge_distance))
+    result["trailing_edge_thickness"] = thickness_te[..., 1]
+    result["area"] = area(coordinates)
+    return result
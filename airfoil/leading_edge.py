@@ -0,0 +1,91 @@
+import numpy as np
+
+from airfoil import resample
+
+# leading edge detection
+# all functions work on a single airfoil (coordinates with shape (P, 2)) or on
+# a batch of airfoils with the same number of points (shape (N, P, 2))
+
+
+def nose_index(coordinates, method="max-curvature"):
+    """
+    returns the index of the nose point (int or array of ints)
+    method:
+        "max-curvature": point with the max. discrete curvature
+        "min-x-value": point with the min. x-value
+    """
+    coordinates = np.asarray(coordinates)
+    if method == "min-x-value":
+        return np.argmin(coordinates[..., 0], axis=-1)
+    elif method == "max-curvature":
+        curvature = resample.curvature(coordinates)
+        # duplicated points result in nan-values
+        curvature = np.where(np.isnan(curvature), -np.inf, curvature)
+        return np.argmax(curvature, axis=-1)
+    raise ValueError("unknown method: {}".format(method))
+
+
+def leading_edge(coordinates, noseindex, num_neighbours=1, iterations=4):
+    """
+    locate the leading edge between the nodes: in the frame of the line from
+    the nose point to the trailing edge (u: along the line, v: normal to it)
+    a parabola u(v) is fitted to the nose point and num_neighbours points on
+    each side (least squares, num_neighbours=1 interpolates). Like a conic
+    section this matches a round nose. The leading edge is the point of the
+    parabola furthest from the trailing edge, found with a few newton
+    iterations which start at the vertex.
+    returns:
+        the leading edge point(s) (shape (2,) or (N, 2))
+        the fractional index of the leading edge (eg. 50.3 lies between the
+        points 50 and 51)
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    single = coordinates.ndim == 2
+    coordinates = coordinates.reshape((-1,) + coordinates.shape[-2:])
+    numairfoils, numcoords = coordinates.shape[:2]
+    k = num_neighbours
+    rows = np.arange(numairfoils)
+    center = np.clip(np.broadcast_to(noseindex, (numairfoils,)), k, numcoords - 1 - k)
+    points = coordinates[rows[:, None], center[:, None] + np.arange(-k, k + 1)]
+
+    # local frame with the nose point at the origin
+    nose = points[:, k]
+    trailing_edge = (coordinates[:, 0] + coordinates[:, -1]) / 2
+    chord = np.linalg.norm(trailing_edge - nose, axis=-1)
+    u_dir = (trailing_edge - nose) / chord[:, None]
+    v_dir = np.stack([-u_dir[:, 1], u_dir[:, 0]], axis=-1)
+    u = np.sum((points - nose[:, None]) * u_dir[:, None], axis=-1)
+    v = np.sum((points - nose[:, None]) * v_dir[:, None], axis=-1)
+
+    # least squares fit of u(v) = a + b * v + c * v**2
+    V = np.stack([np.ones_like(v), v, v ** 2], axis=-1)
+    VT = np.swapaxes(V, 1, 2)
+    a, b, c = np.moveaxis(np.linalg.solve(VT @ V, VT @ u[..., None])[..., 0], 1, 0)
+
+    # the trailing edge is at (chord, 0): maximize the distance of (u(t), t)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.nan_to_num(-b / (2 * c))
+    t = np.clip(t, v.min(axis=1), v.max(axis=1))
+    for _ in range(iterations):
+        p = a + b * t + c * t ** 2
+        dp = b + 2 * c * t
+        f = (p - chord) * dp + t
+        df = dp * dp + (p - chord) * 2 * c + 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.nan_to_num(f / df)
+        t = np.clip(t - step, v.min(axis=1), v.max(axis=1))
+    le_point = nose + (a + b * t + c * t ** 2)[:, None] * u_dir + t[:, None] * v_dir
+
+    # position of t between the fitted points (v is monotonic along the nose)
+    s = v * np.sign(v[:, -1:] - v[:, :1])
+    t = t * np.sign(v[:, -1] - v[:, 0])
+    j = np.clip(np.sum(s <= t[:, None], axis=1) - 1, 0, 2 * k - 1)
+    s0 = s[rows, j]
+    s1 = s[rows, j + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.nan_to_num((t - s0) / (s1 - s0))
+    le_index = center - k + j + frac
+
+    if single:
+        return le_point[0], le_index[0]
+    return le_point, le_index
@@ -0,0 +1,156 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from airfoil.airfoil import Airfoil
+from airfoil.batch import AirfoilBatch
+
+# binary airfoil library:
+#   header:  magic (8 bytes), version (uint32), number of airfoils (uint32),
+#            offset of the index in bytes (uint64)
+#   data:    float64 (little endian) coordinate blocks, one per airfoil
+#   index:   json with the names, offsets (in values), numpoints and noseindex
+# the data is opened with np.memmap, so the airfoils are fetched without
+# copying and every process shares the page-cache of one file.
+
+MAGIC = b"AIRFOILS"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ")
+
+
+class AirfoilLibrary(object):
+    """
+    A read-only collection of airfoils stored in one binary file.
+    Airfoils can be fetched by index or by name.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as lib_file:
+            magic, version, count, index_offset = HEADER.unpack(lib_file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError("{} is not an airfoil library".format(path))
+            if version != VERSION:
+                raise ValueError("airfoil library version {} is not supported".format(version))
+            lib_file.seek(index_offset)
+            index = json.loads(lib_file.read().decode("utf-8"))
+        self.names = index["names"]
+        self.offsets = np.array(index["offsets"], dtype=np.int64)
+        self.numpoints = np.array(index["numpoints"], dtype=np.int64)
+        self.noseindex = np.array(index["noseindex"], dtype=np.int64)
+        self._name_to_index = {name: i for i, name in enumerate(self.names)}
+        num_values = (index_offset - HEADER.size) // 8
+        if num_values:
+            self._data = np.memmap(path, dtype="<f8", mode="r", offset=HEADER.size,
+                                   shape=(num_values,))
+        else:
+            self._data = np.empty(0)
+        assert count == len(self.names)
+
+    @classmethod
+    def write(cls, path, airfoils):
+        """
+        write the airfoils (any iterable, eg. a list, an AirfoilBatch or the
+        generator of airfoil.bulk.import_airfoils) to a library file.
+        The names have to be unique (airfoils are fetched by name), a
+        duplicate name raises a ValueError and no library is written.
+        """
+        names, offsets, numpoints, noseindex = [], [], [], []
+        unique_names = set()
+        offset = 0
+        with open(path, "wb") as lib_file:
+            lib_file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+            for airfoil in airfoils:
+                name = str(airfoil.name)
+                if name in unique_names:
+                    lib_file.close()
+                    os.remove(path)
+                    raise ValueError("duplicate airfoil name: {}".format(name))
+                coordinates = np.ascontiguousarray(airfoil.coordinates, dtype="<f8")
+                lib_file.write(coordinates.tobytes())
+                names.append(name)
+                unique_names.add(name)
+                offsets.append(offset)
+                numpoints.append(len(coordinates))
+                noseindex.append(int(airfoil.noseindex))
+                offset += coordinates.size
+            index_offset = lib_file.tell()
+            lib_file.write(json.dumps({
+                "names": names,
+                "offsets": offsets,
+                "numpoints": numpoints,
+                "noseindex": noseindex}).encode("utf-8"))
+            lib_file.seek(0)
+            lib_file.write(HEADER.pack(MAGIC, VERSION, len(names), index_offset))
+        return cls(path)
+
+    @classmethod
+    def from_dat(cls, path, source, workers=None, use_processes=False):
+        """
+        convert a directory (or zip-archive) of '.dat' files to a library
+        """
+        from airfoil import bulk
+        return cls.write(path, bulk.import_airfoils(source, workers, use_processes))
+
+    def to_dat(self, directory):
+        """export all airfoils of the library as '.dat' files"""
+        os.makedirs(directory, exist_ok=True)
+        for airfoil in self:
+            airfoil.export_dat(os.path.join(directory, airfoil.name + ".dat"))
+
+    def __repr__(self):
+        return "AirfoilLibrary({}, {} airfoils)".format(self.path, len(self))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._name_to_index
+
+    def index(self, key):
+        """returns the index of an airfoil given by its index or name"""
+        if isinstance(key, str):
+            return self._name_to_index[key]
+        return int(key)
+
+    def get_coordinates(self, key):
+        """returns a read-only view of the coordinates (no copy)"""
+        i = self.index(key)
+        start = self.offsets[i]
+        return self._data[start:start + 2 * self.numpoints[i]].reshape(-1, 2)
+
+    def __getitem__(self, key):
+        i = self.index(key)
+        return Airfoil.from_array(self.get_coordinates(i), self.names[i], self.noseindex[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def get_batch(self, keys=None):
+        """
+        returns an AirfoilBatch of the airfoils (all airfoils need the same
+        number of points). Consecutive airfoils are a read-only view of the
+        library, use batch.coordinates.copy() before modifying them in place.
+        """
+        indices = range(len(self)) if keys is None else [self.index(key) for key in keys]
+        indices = list(indices)
+        if not indices:
+            return AirfoilBatch(np.zeros((0, 0, 2)), [], np.zeros(0, dtype=int))
+        numpoints = set(self.numpoints[indices].tolist())
+        if len(numpoints) > 1:
+            raise ValueError("the airfoils have different numbers of points")
+        if indices == list(range(indices[0], indices[-1] + 1)):
+            # consecutive airfoils: view of the memory-map
+            start = self.offsets[indices[0]]
+            size = len(indices) * 2 * numpoints.pop()
+            coordinates = self._data[start:start + size].reshape(len(indices), -1, 2)
+        else:
+            coordinates = np.array([self.get_coordinates(i) for i in indices])
+        return AirfoilBatch(coordinates, [self.names[i] for i in indices],
+                            self.noseindex[indices])
+
+    def close(self):
+        self._data = None
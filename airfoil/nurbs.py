@@ -0,0 +1,374 @@
+import numpy as np
+
+# rational b-splines (NURBS) evaluated with basis matrices, all functions are
+# vectorized over the parameters u (shape (M,)).
+# The parafoil splines (see airfoil.parafoil.Parafoil) are
+# bezier curves of degree 4 with the knots 0.2, 0.4, 0.6, 0.8 inserted once,
+# which results in 9 poles. Their poles are stored as a matrix with the
+# rows x, y, z, w (shape (4, 9)).
+
+PARAFOIL_DEGREE = 4
+PARAFOIL_KNOTS = np.array([0.] * 5 + [0.2, 0.4, 0.6, 0.8] + [1.] * 5)
+
+
+def _inverse(values):
+    """1 / values with 1 / 0 = 0 (convention of the basis recursion)"""
+    return np.divide(1., values, out=np.zeros_like(values), where=values > 0)
+
+
+def basis_matrices(knots, degree, u, order=0):
+    """
+    values and derivatives up to order of all b-spline basis functions at
+    the parameters u, computed with one cox-de boor recursion
+    returns a list of arrays with shape (M, len(knots) - degree - 1)
+    """
+    knots = np.asarray(knots, dtype=float)
+    u = np.atleast_1d(np.asarray(u, dtype=float))
+    # 1 / (t_i+p - t_i) and 1 / (t_i+p+1 - t_i+1) of every degree p
+    factors = [None] + [(_inverse(knots[p:-1] - knots[:-p - 1]),
+                         _inverse(knots[p + 1:] - knots[1:-p])) for p in range(1, degree + 1)]
+
+    # degree 0: indicator of the knot spans, the last span includes the end
+    start, end = knots[:-1], knots[1:]
+    basis = ((u[:, None] >= start) & (u[:, None] < end)).astype(float)
+    last = np.nonzero(start < end)[0][-1]
+    basis[u == knots[-1], last] = 1.
+    bases = [basis]
+    for p in range(1, degree + 1):
+        left, right = factors[p]
+        basis = ((u[:, None] - knots[:-p - 1]) * left * basis[:, :-1] +
+                 (knots[p + 1:] - u[:, None]) * right * basis[:, 1:])
+        bases.append(basis)
+
+    result = []
+    for k in range(order + 1):
+        if k > degree:
+            result.append(np.zeros_like(bases[-1]))
+            continue
+        # N'_i,p = p * (N_i,p-1 / (t_i+p - t_i) - N_i+1,p-1 / (t_i+p+1 - t_i+1))
+        basis = bases[degree - k]
+        for p in range(degree - k + 1, degree + 1):
+            left, right = factors[p]
+            basis = p * (basis[:, :-1] * left - basis[:, 1:] * right)
+        result.append(basis)
+    return result
+
+
+def basis_matrix(knots, degree, u, derivative=0):
+    """
+    values (or derivatives) of all b-spline basis functions at the parameters u
+    returns an array with shape (M, len(knots) - degree - 1)
+    """
+    return basis_matrices(knots, degree, u, derivative)[derivative]
+
+
+class RationalBSpline(object):
+    """
+    A rational b-spline curve
+    poles: array with shape (num_poles, dim)
+    weights: array with shape (num_poles,)
+    """
+
+    def __init__(self, poles, weights=None, knots=PARAFOIL_KNOTS, degree=PARAFOIL_DEGREE):
+        self.poles = np.asarray(poles, dtype=float)
+        if weights is None:
+            weights = np.ones(len(self.poles))
+        self.weights = np.asarray(weights, dtype=float)
+        self.knots = np.asarray(knots, dtype=float)
+        self.degree = degree
+        assert len(self.knots) - degree - 1 == len(self.poles) == len(self.weights)
+
+    @classmethod
+    def from_mat(cls, mat):
+        """
+        the 2d spline of a parafoil pole-matrix with the rows x, y, z, w
+        (the z-values are ignored)
+        """
+        mat = np.asarray(mat, dtype=float)
+        return cls(mat[:2].T, mat[3])
+
+    def derivatives(self, u, order=2):
+        """
+        returns the points and their derivatives up to order (max. 2) with
+        respect to u: [C, C', C''] (every array with shape (M, dim))
+        """
+        # derivatives of the weighted poles A(u) = sum(N_i * w_i * P_i) and
+        # of the weight W(u) = sum(N_i * w_i)
+        bases = [basis * self.weights for basis in
+                 basis_matrices(self.knots, self.degree, u, order)]
+        A = [basis @ self.poles for basis in bases]
+        W = [basis.sum(axis=-1)[:, None] for basis in bases]
+        C = A[0] / W[0]
+        result = [C]
+        if order >= 1:
+            dC = (A[1] - W[1] * C) / W[0]
+            result.append(dC)
+        if order >= 2:
+            ddC = (A[2] - 2 * W[1] * dC - W[2] * C) / W[0]
+            result.append(ddC)
+        return result
+
+    def value(self, u):
+        """points of the curve at the parameters u (shape (M, dim))"""
+        return self.derivatives(u, order=0)[0]
+
+    def curvature(self, u):
+        """unsigned curvature of a 2d curve at the parameters u"""
+        _, dC, ddC = self.derivatives(u)
+        cross = dC[:, 0] * ddC[:, 1] - dC[:, 1] * ddC[:, 0]
+        speed = np.linalg.norm(dC, axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.nan_to_num(abs(cross) / speed ** 3)
+
+    def arc_length(self, u, num_gauss=5):
+        """
+        length of the curve from the first knot to every parameter of the
+        increasing array u, integrated with gauss-legendre between the
+        parameters
+        """
+        u = np.atleast_1d(np.asarray(u, dtype=float))
+        bounds = np.concatenate([self.knots[:1], u])
+        nodes, weights = np.polynomial.legendre.leggauss(num_gauss)
+        half = np.diff(bounds)[:, None] / 2
+        points = (bounds[:-1, None] + half * (nodes + 1)).ravel()
+        speed = np.linalg.norm(self.derivatives(points, order=1)[1], axis=-1)
+        return np.cumsum(np.sum(speed.reshape(half.shape[0], -1) * weights * half, axis=-1))
+
+    def value_jacobian(self, u):
+        """
+        derivatives of the points at the (fixed) parameters u with respect to
+        the poles (shape (M, dim, num_poles, dim)) and the weights (shape
+        (M, dim, num_poles)), the second axis is the coordinate of the point
+        """
+        return self.derivatives_jacobian(u, order=0)[0]
+
+    def derivatives_jacobian(self, u, order=2):
+        """
+        derivatives of [C, C', C''] (see derivatives) at the (fixed)
+        parameters u with respect to the poles and the weights
+        returns a list of (d_poles, d_weights) with the shapes of value_jacobian
+        """
+        bases = basis_matrices(self.knots, self.degree, u, order)
+        W = [(basis @ self.weights)[:, None] for basis in bases]
+        # S_j = N_j / W and its derivatives: dC / dP_j = w_j * S_j and
+        # dC / dw_j = S_j * (P_j - C), differentiated with respect to u
+        S = [bases[0] / W[0]]
+        if order >= 1:
+            S.append((bases[1] - S[0] * W[1]) / W[0])
+        if order >= 2:
+            S.append((bases[2] - 2 * S[1] * W[1] - S[0] * W[2]) / W[0])
+        C = [(S_k * self.weights) @ self.poles for S_k in S]
+        diff = self.poles[None] - C[0][:, None]
+        d_weights = [S[0][..., None] * diff]
+        if order >= 1:
+            d_weights.append(S[1][..., None] * diff - S[0][..., None] * C[1][:, None])
+        if order >= 2:
+            d_weights.append(S[2][..., None] * diff - 2 * S[1][..., None] * C[1][:, None] -
+                             S[0][..., None] * C[2][:, None])
+        eye = np.eye(self.poles.shape[-1])[None, :, None, :]
+        return [((S_k * self.weights)[:, None, :, None] * eye, np.swapaxes(d_w, -1, -2))
+                for S_k, d_w in zip(S, d_weights)]
+
+    def project(self, points, num=201, iterations=8, tolerance=1e-12):
+        """
+        parameters of the closest points of the curve to the points (shape
+        (M, dim)): the nearest of num sampled parameters refined by (max.
+        iterations) newton iterations of (C(u) - p) * C'(u) = 0 for all points
+        at once
+        """
+        points = np.asarray(points, dtype=float)
+        samples = np.linspace(self.knots[0], self.knots[-1], num)
+        distance = np.linalg.norm(points[:, None] - self.value(samples)[None], axis=-1)
+        u = samples[np.argmin(distance, axis=-1)]
+        for _ in range(iterations):
+            C, dC, ddC = self.derivatives(u)
+            diff = C - points
+            f = np.sum(diff * dC, axis=-1)
+            df = np.sum(dC * dC, axis=-1) + np.sum(diff * ddC, axis=-1)
+            # not convex: gauss-newton step
+            df = np.where(df > 0, df, np.sum(dC * dC, axis=-1))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                step = np.nan_to_num(f / df)
+            u, previous = np.clip(u - step, self.knots[0], self.knots[-1]), u
+            if np.max(abs(u - previous)) < tolerance:
+                break
+        return u
+
+    def distance(self, points, jacobian=False, **kwargs):
+        """
+        distance of the points (shape (M, dim)) to the curve, see project for
+        the kwargs. With jacobian=True the derivatives of the distances with
+        respect to the poles (shape (M, num_poles, dim)) and the weights (shape
+        (M, num_poles)) are returned too. The foot point parameters are
+        stationary (or fixed at the ends), so the derivative is the normal
+        direction times the derivative of the foot point.
+        returns: distance or (distance, d_poles, d_weights)
+        """
+        points = np.asarray(points, dtype=float)
+        u = self.project(points, **kwargs)
+        diff = self.value(u) - points
+        distance = np.linalg.norm(diff, axis=-1)
+        if not jacobian:
+            return distance
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normal = np.nan_to_num(diff / distance[:, None])
+        d_poles, d_weights = self.value_jacobian(u)
+        d_poles = np.einsum("mk,mkjd->mjd", normal, d_poles)
+        d_weights = np.einsum("mk,mkj->mj", normal, d_weights)
+        return distance, d_poles, d_weights
+
+    def distribution(self, numpoints, curvature_factor=1., num=1000):
+        """
+        parameters of numpoints points with a constant step of a blend of
+        the arc length and the integrated curvature (curvature_factor=0:
+        equidistant points, 1: the points are concentrated at regions with
+        high curvature). The curve is sampled at num parameters.
+        """
+        std_dist = np.linspace(self.knots[0], self.knots[-1], num)
+        length = self.arc_length(std_dist)
+        length /= length[-1]
+
+        curvature = np.concatenate([[0.], self.curvature(std_dist)[:-1]])
+        curvature = np.cumsum(curvature)
+        curvature /= curvature[-1]
+        curvature = curvature * curvature_factor + std_dist * (1 - curvature_factor)
+        curvature /= curvature[-1]
+
+        dist = np.interp(np.linspace(0, 1, numpoints), length, std_dist)
+        return np.interp(dist, curvature, std_dist)
+
+    def distribution_jacobian(self, numpoints, curvature_factor=1., num=1000, num_gauss=5):
+        """
+        parameters of distribution (2d curves) and their derivatives with
+        respect to the poles (shape (numpoints, num_poles, dim)) and the
+        weights (shape (numpoints, num_poles))
+        returns: u, d_poles, d_weights
+        """
+        num_poles, dim = self.poles.shape
+
+        def flat(d_poles, d_weights):
+            # one axis for all poles and weights: (..., num_poles * (dim + 1))
+            return np.concatenate([d_poles.reshape(d_poles.shape[:-2] + (-1,)), d_weights],
+                                  axis=-1)
+
+        def normalized(values, d_values):
+            return (values / values[-1],
+                    d_values / values[-1] - values[:, None] * d_values[-1] / values[-1] ** 2)
+
+        def speed_jacobian(dC, d_dC):
+            speed = np.linalg.norm(dC, axis=-1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                tangent = np.nan_to_num(dC / speed[:, None])
+            return speed, np.einsum("mk,mkp->mp", tangent, d_dC)
+
+        std_dist = np.linspace(self.knots[0], self.knots[-1], num)
+
+        # arc length (see arc_length)
+        bounds = np.concatenate([self.knots[:1], std_dist])
+        nodes, weights = np.polynomial.legendre.leggauss(num_gauss)
+        half = np.diff(bounds)[:, None] / 2
+        points = (bounds[:-1, None] + half * (nodes + 1)).ravel()
+        d_speed = flat(*self.derivatives_jacobian(points, order=1)[1])
+        speed, d_speed = speed_jacobian(self.derivatives(points, order=1)[1], d_speed)
+        gauss_weights = (weights * half).ravel()
+        length = np.cumsum(np.sum((speed * gauss_weights).reshape(num, -1), axis=-1))
+        d_length = np.cumsum(np.sum((d_speed * gauss_weights[:, None]).reshape(
+            num, num_gauss, -1), axis=1), axis=0)
+        length, d_length = normalized(length, d_length)
+
+        # curvature (see curvature)
+        _, dC, ddC = self.derivatives(std_dist)
+        _, d_dC, d_ddC = [flat(*jacobian) for jacobian in self.derivatives_jacobian(std_dist)]
+        cross = dC[:, 0] * ddC[:, 1] - dC[:, 1] * ddC[:, 0]
+        d_cross = (d_dC[:, 0] * ddC[:, 1, None] + dC[:, 0, None] * d_ddC[:, 1] -
+                   d_dC[:, 1] * ddC[:, 0, None] - dC[:, 1, None] * d_ddC[:, 0])
+        speed, d_speed = speed_jacobian(dC, d_dC)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            curvature = np.nan_to_num(abs(cross) / speed ** 3)
+            d_curvature = np.nan_to_num(np.sign(cross)[:, None] * d_cross / speed[:, None] ** 3 -
+                                        3 * (curvature / speed)[:, None] * d_speed)
+        curvature = np.cumsum(np.concatenate([[0.], curvature[:-1]]))
+        d_curvature = np.cumsum(np.concatenate([np.zeros_like(d_curvature[:1]), d_curvature[:-1]]), axis=0)
+        curvature, d_curvature = normalized(curvature, d_curvature)
+        curvature = curvature * curvature_factor + std_dist * (1 - curvature_factor)
+        curvature, d_curvature = normalized(curvature, d_curvature * curvature_factor)
+
+        t = np.linspace(0, 1, numpoints)
+        dist = np.interp(t, length, std_dist)
+        d_dist = _interp_jacobian(t, np.zeros((numpoints, d_length.shape[-1])),
+                                  length, d_length, std_dist)
+        u = np.interp(dist, curvature, std_dist)
+        d_u = _interp_jacobian(dist, d_dist, curvature, d_curvature, std_dist)
+        return (u, d_u[:, :num_poles * dim].reshape(numpoints, num_poles, dim),
+                d_u[:, num_poles * dim:])
+
+
+def _interp_jacobian(x, d_x, xp, d_xp, fp):
+    """
+    derivatives of np.interp(x, xp, fp) for the derivatives of x (shape
+    (len(x), P)) and of xp (shape (len(xp), P)), fp is fixed
+    """
+    k = np.clip(np.searchsorted(xp, x, side="right") - 1, 0, len(xp) - 2)
+    width = xp[k + 1] - xp[k]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.nan_to_num((fp[k + 1] - fp[k]) / width)
+        position = np.nan_to_num((x - xp[k]) / width)
+    d_y = slope[:, None] * (d_x - (1 - position)[:, None] * d_xp[k] -
+                            position[:, None] * d_xp[k + 1])
+    # np.interp is constant outside of xp
+    inside = (x >= xp[0]) & (x <= xp[-1])
+    return np.where(inside[:, None], d_y, 0.)
+
+
+def parafoil_coordinates(upper_mat, lower_mat, numpoints=300, curvature_factor=1.):
+    """
+    discretize the upper and lower spline of a parafoil (pole-matrices with
+    the rows x, y, z, w) with numpoints points each
+    returns the coordinates (trailing edge - upper side - lower side) with
+    shape (2 * numpoints - 1, 2)
+    """
+    upper = RationalBSpline.from_mat(upper_mat)
+    lower = RationalBSpline.from_mat(lower_mat)
+    upper_points = upper.value(upper.distribution(numpoints, curvature_factor))
+    lower_points = lower.value(lower.distribution(numpoints, curvature_factor))
+    return np.concatenate([upper_points[::-1], lower_points[1:]])
+
+
+def mat_jacobian(d_poles, d_weights):
+    """
+    derivatives with respect to the 2d poles (shape (..., num_poles, 2)) and
+    the weights (shape (..., num_poles)) arranged like a parafoil
+    pole-matrix (rows x, y, z, w), shape (..., 4, num_poles)
+    """
+    d_poles = np.asarray(d_poles)
+    jacobian = np.zeros(d_poles.shape[:-2] + (4, d_poles.shape[-2]))
+    jacobian[..., 0, :] = d_poles[..., 0]
+    jacobian[..., 1, :] = d_poles[..., 1]
+    jacobian[..., 3, :] = d_weights
+    return jacobian
+
+
+def parafoil_coordinates_jacobian(upper_mat, lower_mat, numpoints=300, curvature_factor=1.):
+    """
+    coordinates of parafoil_coordinates and their derivatives with respect to
+    the upper and the lower pole-matrix (shapes (2 * numpoints - 1, 2, 4, 9)),
+    including the movement of the points along the splines (see
+    RationalBSpline.distribution_jacobian)
+    returns: coordinates, d_upper, d_lower
+    """
+    coordinates, jacobians = [], []
+    for mat in [upper_mat, lower_mat]:
+        spline = RationalBSpline.from_mat(mat)
+        u, du_poles, du_weights = spline.distribution_jacobian(numpoints, curvature_factor)
+        C, dC = spline.derivatives(u, order=1)
+        d_poles, d_weights = spline.value_jacobian(u)
+        # C(u(p), p): partial derivative + C' * du / dp
+        d_poles = d_poles + dC[:, :, None, None] * du_poles[:, None]
+        d_weights = d_weights + dC[:, :, None] * du_weights[:, None]
+        coordinates.append(C)
+        jacobians.append(mat_jacobian(d_poles, d_weights))
+    d_upper = np.zeros((2 * numpoints - 1,) + jacobians[0].shape[1:])
+    d_lower = np.zeros((2 * numpoints - 1,) + jacobians[1].shape[1:])
+    d_upper[:numpoints] = jacobians[0][::-1]
+    d_lower[numpoints:] = jacobians[1][1:]
+    return np.concatenate([coordinates[0][::-1], coordinates[1][1:]]), d_upper, d_lower
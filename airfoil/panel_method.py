@@ -0,0 +1,160 @@
+import numpy as np
+
+# inviscid linear-strength vortex panel method (see Katz & Plotkin, Low-Speed
+# Aerodynamics, 11.4.1) with the kutta condition gamma_te_upper + gamma_te_lower = 0
+# all functions work on a single airfoil (coordinates with shape (P, 2)) or on
+# a batch of airfoils with the same number of points (shape (N, P, 2)).
+# The coordinates are ordered from the trailing edge over the upper side to
+# the lower side (selig order, counterclockwise), the vortex strength is
+# positive counterclockwise and angles are in radians.
+
+
+def influence_matrices(coordinates):
+    """
+    returns the normal- and tangential-velocity induced at the panel
+    midpoints by the unit vortex strengths at the nodes
+    (shapes (P - 1, P) or (N, P - 1, P)). The velocities are the limits from
+    the outside of the airfoil.
+    """
+    z = np.asarray(coordinates, dtype=float)
+    z = z[..., 0] + 1j * z[..., 1]
+    start, end = z[..., :-1], z[..., 1:]
+    length = abs(end - start)
+    direction = (end - start) / length  # e^(i phi) of every panel
+    midpoint = (start + end) / 2
+
+    # midpoints (rows) in the local coordinates of the panels (columns)
+    local = (midpoint[..., :, None] - start[..., None, :]) * np.conj(direction[..., None, :])
+    L = length[..., None, :]
+    log = np.log(local / (local - L))
+    # self-influence: limit from the outside (right side of the panel)
+    diagonal = np.arange(local.shape[-1])
+    log[..., diagonal, diagonal] = 1j * np.pi
+
+    # complex velocity u - iv of the linear vortex gamma_1 -> gamma_2:
+    # w = -i / 2pi * (gamma_1 * (log * (1 - z / L) + 1) + gamma_2 * (z / L * log - 1))
+    w_start = -1j / (2 * np.pi) * (log * (1 - local / L) + 1)
+    w_end = -1j / (2 * np.pi) * (local / L * log - 1)
+    # global velocity: conj(w) * e^(i phi)
+    v_start = np.conj(w_start) * direction[..., None, :]
+    v_end = np.conj(w_end) * direction[..., None, :]
+    velocity = np.zeros(local.shape[:-1] + (local.shape[-1] + 1,), dtype=complex)
+    velocity[..., :-1] += v_start
+    velocity[..., 1:] += v_end
+
+    # projection on the tangent t and the outward normal n = -i * t of the rows
+    t = direction[..., :, None]
+    tangential = (velocity * np.conj(t)).real
+    normal = (velocity * np.conj(-1j * t)).real
+    return normal, tangential
+
+
+class LinearVortexSolver(object):
+    """
+    Inviscid panel solver for one airfoil or a batch of airfoils.
+    The influence matrix is solved once per geometry for a unit free-stream
+    in x- and y-direction, the solution for any angle of attack is the
+    superposition of these two solutions. All coefficients are computed for
+    arrays of angles of attack (shape (A,)), the results have the shape
+    (A,) or (A, P - 1) for a single airfoil and (N, A) or (N, A, P - 1) for
+    a batch.
+    """
+
+    def __init__(self, coordinates, moment_reference=(0.25, 0.), chord=None):
+        self.coordinates = np.asarray(coordinates, dtype=float)
+        self.moment_reference = np.asarray(moment_reference, dtype=float)
+        normal, tangential = influence_matrices(self.coordinates)
+        num_nodes = self.coordinates.shape[-2]
+        panels = self.coordinates[..., 1:, :] - self.coordinates[..., :-1, :]
+        self.lengths = np.linalg.norm(panels, axis=-1)
+        self.midpoints = (self.coordinates[..., 1:, :] + self.coordinates[..., :-1, :]) / 2
+        self.normals = np.stack([panels[..., 1], -panels[..., 0]], axis=-1) / self.lengths[..., None]
+        if chord is None:
+            trailing_edge = (self.coordinates[..., 0, :] + self.coordinates[..., -1, :]) / 2
+            chord = np.max(np.linalg.norm(self.coordinates - trailing_edge[..., None, :],
+                                          axis=-1), axis=-1)
+        self.chord = np.asarray(chord, dtype=float)
+
+        tangents = panels / self.lengths[..., None]
+
+        # flow tangency at the midpoints and the kutta condition
+        matrix = np.zeros(normal.shape[:-2] + (num_nodes, num_nodes))
+        matrix[..., :-1, :] = normal
+        matrix[..., -1, 0] = 1.
+        matrix[..., -1, -1] = 1.
+        # right hand side for the free-stream (1, 0) and (0, 1)
+        rhs = np.zeros(normal.shape[:-2] + (num_nodes, 2))
+        rhs[..., :-1, :] = -self.normals
+
+        # trailing edge: at a cusp the upper and the lower panel coincide and
+        # opposite vortex strengths on both sides induce (almost) no normal
+        # velocity, this mode is not removed by the kutta condition. The
+        # tangency of the two panels is replaced by the flow through the
+        # trailing edge (difference of the normal velocities) and by a
+        # vanishing velocity along the bisector inside of the airfoil
+        # (the vortex strength is the jump of the tangential velocity).
+        interior_upper = tangential[..., 0, :].copy()
+        interior_upper[..., :2] -= 0.5
+        interior_lower = tangential[..., -1, :].copy()
+        interior_lower[..., -2:] -= 0.5
+        matrix[..., 0, :] = normal[..., 0, :] - normal[..., -1, :]
+        rhs[..., 0, :] = self.normals[..., -1, :] - self.normals[..., 0, :]
+        matrix[..., -2, :] = interior_upper - interior_lower
+        rhs[..., -2, :] = tangents[..., -1, :] - tangents[..., 0, :]
+
+        self.gamma_unit = np.linalg.solve(matrix, rhs)  # (..., P, 2)
+        # tangential velocity at the midpoints for the unit free-streams
+        self.velocity_unit = tangential @ self.gamma_unit + tangents
+
+    def _free_stream(self, alpha):
+        alpha = np.atleast_1d(np.asarray(alpha, dtype=float))
+        return np.stack([np.cos(alpha), np.sin(alpha)])  # (2, A)
+
+    def gamma(self, alpha):
+        """vortex strength at the nodes (A, P) or (N, A, P)"""
+        return np.swapaxes(self.gamma_unit @ self._free_stream(alpha), -1, -2)
+
+    def surface_velocity(self, alpha):
+        """
+        tangential velocity at the panel midpoints (positive in the direction
+        of the coordinates), shape (A, P - 1) or (N, A, P - 1)
+        """
+        return np.swapaxes(self.velocity_unit @ self._free_stream(alpha), -1, -2)
+
+    def surface_cp(self, alpha):
+        """pressure coefficient at the panel midpoints"""
+        return 1 - self.surface_velocity(alpha) ** 2
+
+    def cl(self, alpha):
+        """lift coefficient from the circulation (kutta-joukowsky)"""
+        gamma = self.gamma(alpha)
+        lengths = self.lengths[..., None, :]
+        circulation = np.sum((gamma[..., 1:] + gamma[..., :-1]) / 2 * lengths, axis=-1)
+        # counterclockwise circulation results in negative lift
+        return -2 * circulation / self.chord[..., None]
+
+    def cm(self, alpha):
+        """
+        pitching moment coefficient (nose up positive) around the
+        moment_reference from the integrated pressure
+        """
+        return self._moment(self.surface_cp(alpha))
+
+    def _moment(self, cp):
+        # force of the panels: -cp * n * ds
+        force = -cp[..., None] * (self.normals * self.lengths[..., None])[..., None, :, :]
+        arm = (self.midpoints - self.moment_reference)[..., None, :, :]
+        moment = np.sum(arm[..., 0] * force[..., 1] - arm[..., 1] * force[..., 0], axis=-1)
+        return -moment / self.chord[..., None] ** 2
+
+    def solve(self, alpha):
+        """
+        returns a dict with the arrays alpha, cl, cm and cp (at the panel
+        midpoints)
+        """
+        alpha = np.atleast_1d(np.asarray(alpha, dtype=float))
+        cp = self.surface_cp(alpha)
+        return {"alpha": alpha,
+                "cl": self.cl(alpha),
+                "cm": self._moment(cp),
+                "cp": cp}
@@ -0,0 +1,388 @@
+import numpy as np
+
+from airfoil import nurbs
+from airfoil.airfoil import Airfoil
+
+# default parafoil (pole-matrices with the rows x, y, z, w)
+DEFAULT_UPPER_MAT = [
+    [0.   , 0.   , 0.01 , 0.07 , 0.2  , 0.5  , 0.7  , 0.85 , 1.   ],
+    [0.   , 0.011, 0.029, 0.05 , 0.082, 0.083, 0.051, 0.034, 0.   ],
+    [0.   , 0.   , 0.   , 0.   , 0.   , 0.   , 0.   , 0.   , 0.   ],
+    [1.   , 1.   , 1.   , 1.   , 1.   , 1.   , 1.   , 1.   , 1.   ]
+    ]
+
+DEFAULT_LOWER_MAT = [
+    [ 0.   ,  0.   ,  0.01 ,  0.07 ,  0.2  ,  0.5  ,  0.7  ,  0.85 ,  1.   ],
+    [ 0.   , -0.008, -0.022, -0.038, -0.046, -0.036, -0.021, -0.012,  0.   ],
+    [ 0.   ,  0.   ,  0.   ,  0.   ,  0.   ,  0.   ,  0.   ,  0.   ,  0.   ],
+    [ 1.   ,  1.   ,  1.   ,  1.   ,  1.   ,  1.   ,  1.   ,  1.   ,  1.   ]
+    ]
+
+
+class Parafoil(object):
+    """
+    An airfoil represented by two NURBS (upper and lower side, see
+    airfoil.nurbs). The splines are stored as pole-matrices with the rows
+    x, y, z, w (shape (4, 9)), the first pole is the leading edge and the
+    last pole the trailing edge.
+    The mappings select the values of the matrices which are variated by
+    calibrate and optimize.
+    """
+    x_mapping = [
+        [0, 2], # x2
+        [0, 3], # x3
+        [0, 4], # x4
+        [0, 5], # x5
+        [0, 6], # x6
+        [0, 7], # x7
+        ]
+
+    y_mapping = [
+        [1, 1], # y1
+        [1, 2], # y2
+        [1, 3], # y3
+        [1, 4], # y4
+        [1, 5], # y5
+        [1, 6], # y6
+        [1, 7], # y7
+        ]
+
+    w_mapping = [
+        [3, 1], # w1
+        [3, 2], # w2
+        [3, 3], # w3
+        [3, 4], # w4
+        [3, 5], # w5
+        [3, 6], # w6
+        [3, 7], # w7
+        ]
+
+    def __init__(self, upper_mat=None, lower_mat=None):
+        if upper_mat is None:
+            upper_mat = DEFAULT_UPPER_MAT
+        if lower_mat is None:
+            lower_mat = DEFAULT_LOWER_MAT
+        self.upper_mat = np.array(upper_mat, dtype=float)
+        self.lower_mat = np.array(lower_mat, dtype=float)
+
+    def copy(self):
+        return Parafoil(self.upper_mat, self.lower_mat)
+
+    def get_splines(self):
+        """returns the upper and the lower spline (nurbs.RationalBSpline)"""
+        return (nurbs.RationalBSpline.from_mat(self.upper_mat),
+                nurbs.RationalBSpline.from_mat(self.lower_mat))
+
+    def discretize(self, numpoints=300, curvature_factor=1):
+        """
+        returns the coordinates of the upper and lower spline (see
+        airfoil.nurbs.parafoil_coordinates)
+        """
+        return nurbs.parafoil_coordinates(self.upper_mat, self.lower_mat,
+                                          numpoints, curvature_factor)
+
+    def get_airfoil(self, numpoints=50, curvature_factor=0.5):
+        return Airfoil(self.discretize(numpoints, curvature_factor))
+
+    @staticmethod
+    def _get_values(mapping, mat):
+        """
+        returns a flattened representation of all values which are allowed to be variated
+        """
+        values = []
+        for m in mapping:
+            values.append(mat[m[0]][m[1]])
+        return np.array(values)
+
+    @staticmethod
+    def _set_values(mapping, mat, values):
+        """
+        sets values of mat by a flat vector of values (needs to have same length as mapping)
+        """
+        for i, m in enumerate(mapping):
+            if m == [1, 1]:
+                # compute the corresponsing x-value
+                x, y, z, w = mat.T[1]
+                mat[0][1] = x * values[i] / y
+                mat[1][1] = values[i]
+            else:
+                mat[m[0]][m[1]] = values[i]
+        return mat
+
+    @staticmethod
+    def _values_jacobian(mapping, mat):
+        """
+        derivatives of mat with respect to the flat vector of values of
+        _set_values (shape (len(mapping), 4, 9)). The x-value of [1, 1] moves
+        with the y-value (constant tangent at the nose).
+        """
+        jacobian = np.zeros((len(mapping),) + np.shape(mat))
+        for i, m in enumerate(mapping):
+            jacobian[i][m[0]][m[1]] = 1.
+            if m == [1, 1]:
+                x, y, z, w = mat.T[1]
+                jacobian[i][0][1] = x / y
+        return jacobian
+
+    def _get_bounds_and_mapping(self, calibrate_x:bool=False, calibrate_y:bool=True, calibrate_w:bool=False, upper=True):
+        x_lower_bounds = [0. ] * 6
+        x_upper_bounds = [1. ] * 6
+        y_lower_bounds = [-1.] * 7
+        y_upper_bounds = [1. ] * 7
+        w_lower_bounds = [0.1] * 7
+        w_upper_bounds = [1.]  * 7
+        if upper:
+            y_lower_bounds[0] = 0
+        else:
+            y_upper_bounds[0] = 0
+        upper_bounds = []
+        lower_bounds = []
+        mapping = []
+
+        if calibrate_x:
+            lower_bounds += x_lower_bounds
+            upper_bounds += x_upper_bounds
+            mapping += self.x_mapping
+        if calibrate_y:
+            lower_bounds += y_lower_bounds
+            upper_bounds += y_upper_bounds
+            mapping += self.y_mapping
+        if calibrate_w:
+            lower_bounds += w_lower_bounds
+            upper_bounds += w_upper_bounds
+            mapping += self.w_mapping
+        return mapping, lower_bounds, upper_bounds
+
+    def _calibrate_one_side(self, mat, mapping, bounds, coordinates, verbose=0):
+        """
+        fits the spline of mat (modified in place) to the coordinates
+        returns the result of the least squares (residuals: distances)
+        """
+        from scipy.optimize import least_squares
+
+        def cost_function(values, mat, coordinates):
+            # distances of all coordinates to the spline at once
+            mat = self._set_values(mapping, mat, values)
+            spline = nurbs.RationalBSpline.from_mat(mat)
+            return spline.distance(coordinates)
+
+        def jacobian(values, mat, coordinates):
+            mat = self._set_values(mapping, mat, values)
+            spline = nurbs.RationalBSpline.from_mat(mat)
+            _, d_poles, d_weights = spline.distance(coordinates, jacobian=True)
+            d_mat = nurbs.mat_jacobian(d_poles, d_weights)
+            return np.einsum("mrc,irc->mi", d_mat, self._values_jacobian(mapping, mat))
+
+        start_values = self._get_values(mapping, mat)
+        # trf: dogbox converges slowly if values start at the bounds (eg. w = 1)
+        best = least_squares(cost_function, start_values, jac=jacobian, bounds=bounds,
+                             method="trf", args=(mat, coordinates), gtol=1e-6, xtol=1e-6,
+                             verbose=verbose)
+        self._set_values(mapping, mat, best.x)
+        return best
+
+    def calibrate(self, airfoil:Airfoil, calibrate_x:bool=False, calibrate_y:bool=True,
+                  calibrate_w:bool=False, verbose=0):
+        """
+        calibrates the splines to match the airfoil as good as possible (lstsq)
+        returns the least squares results of the upper and the lower spline
+        """
+        mapping, lower_bounds_upper_spline, upper_bounds_upper_spline = self._get_bounds_and_mapping(calibrate_x, calibrate_y, calibrate_w, upper=True)
+        mapping, lower_bounds_lower_spline, upper_bounds_lower_spline = self._get_bounds_and_mapping(calibrate_x, calibrate_y, calibrate_w, upper=False)
+        bounds_upper_spline = (lower_bounds_upper_spline, upper_bounds_upper_spline)
+        bounds_lower_spline = (lower_bounds_lower_spline, upper_bounds_lower_spline)
+
+        upper_result = self._calibrate_one_side(self.upper_mat, mapping, bounds_upper_spline,
+                                                airfoil.get_upper_data()[::-1], verbose)
+        lower_result = self._calibrate_one_side(self.lower_mat, mapping, bounds_lower_spline,
+                                                airfoil.get_lower_data(), verbose)
+        return upper_result, lower_result
+
+    def optimize(self, target_function, optimize_x, optimize_y, optimize_w, numpoints=50,
+                 backend=None, target_jacobian=None, verbose=0):
+        """
+        optimize the splines for a target_function which returns a list of residuals.
+        target_function(airfoil) or, if a backend (name or case-class, see
+        airfoil.backends) is given, target_function(airfoil, case) with a case
+        of the backend for the airfoil
+        target_jacobian: optional function with the same arguments which
+        returns the derivatives of the residuals with respect to the
+        coordinates of the airfoil (shape (num_residuals, 2 * numpoints - 1,
+        2)). It is combined with the exact derivatives of the coordinates
+        (see airfoil.nurbs.parafoil_coordinates_jacobian) instead of finite
+        differences of the target_function. If the target_jacobian fails,
+        finite differences of the target_function are used.
+        The matrices are set to the best values, returns the least squares result.
+        """
+        from scipy.optimize import least_squares
+        if backend is not None:
+            from airfoil.backends import get_backend
+            case_class = get_backend(backend)
+        mapping, lower_bounds_upper_spline, upper_bounds_upper_spline = self._get_bounds_and_mapping(optimize_x, optimize_y, optimize_w, upper=True)
+        mapping, lower_bounds_lower_spline, upper_bounds_lower_spline = self._get_bounds_and_mapping(optimize_x, optimize_y, optimize_w, upper=False)
+
+        bounds = (lower_bounds_upper_spline + lower_bounds_lower_spline,
+                  upper_bounds_upper_spline + upper_bounds_lower_spline)
+
+        upper_start_values = self._get_values(mapping, self.upper_mat)
+        lower_start_values = self._get_values(mapping, self.lower_mat)
+        start_values = np.array(upper_start_values.tolist() + lower_start_values.tolist())
+
+        def set_values(values):
+            upper_mat = self._set_values(mapping, self.upper_mat, values[:int(len(values) / 2)])
+            lower_mat = self._set_values(mapping, self.lower_mat, values[int(len(values) / 2):])
+            return upper_mat, lower_mat
+
+        def evaluate(function, airfoil):
+            if backend is None:
+                return function(airfoil)
+            with case_class(airfoil) as case:
+                return function(airfoil, case)
+
+        def cost_function(values):
+            set_values(values)
+            airfoil = self.get_airfoil(numpoints)
+            try:
+                residuals = evaluate(target_function, airfoil)
+            except Exception:
+                return 1.  # return a high value
+            return sum(residuals)
+
+        def finite_differences(values):
+            # forward steps (backward at the upper bounds)
+            steps = np.sqrt(np.finfo(float).eps) * np.maximum(1., abs(values))
+            steps = np.where(values + steps > bounds[1], -steps, steps)
+            cost = cost_function(values)
+            jacobian = np.empty((1, len(values)))
+            for i, step in enumerate(steps):
+                shifted = values.copy()
+                shifted[i] += step
+                jacobian[0, i] = (cost_function(shifted) - cost) / step
+            set_values(values)
+            return jacobian
+
+        def jacobian(values):
+            upper_mat, lower_mat = set_values(values)
+            # the same discretization as get_airfoil
+            coordinates, d_upper, d_lower = nurbs.parafoil_coordinates_jacobian(
+                upper_mat, lower_mat, numpoints, curvature_factor=0.5)
+            try:
+                d_residuals = np.asarray(evaluate(target_jacobian, Airfoil(coordinates)))
+            except Exception:
+                return finite_differences(values)
+            d_values = np.concatenate([
+                np.einsum("pkrc,irc->pki", d_upper, self._values_jacobian(mapping, upper_mat)),
+                np.einsum("pkrc,irc->pki", d_lower, self._values_jacobian(mapping, lower_mat))],
+                axis=-1)
+            # the cost is the sum of the residuals
+            return np.einsum("npk,pki->i", d_residuals, d_values)[None]
+
+        best = least_squares(cost_function, start_values,
+                             jac="2-point" if target_jacobian is None else jacobian,
+                             bounds=bounds, method="dogbox", gtol=1e-6, xtol=1e-7,
+                             verbose=verbose)
+        set_values(best.x)
+        return best
+
+
+def _start_points(start, flags, num_starts, spread, seed, margin=1e-3):
+    """
+    the start parafoil and num_starts - 1 copies with the variated values
+    (see flags) multiplied by random factors (1 + spread * normal). The
+    values of all start points are clipped strictly inside of the bounds
+    (margin: fraction of the range), so y1 is never 0 (the x-value of the
+    pole [1, 1] is scaled with y1, see Parafoil._set_values)
+    returns a list of (upper_mat, lower_mat)
+    """
+    if flags[1] and (start.upper_mat[1][1] == 0 or start.lower_mat[1][1] == 0):
+        raise ValueError("the start parafoil needs y1 != 0 (tangent at the nose)")
+    rng = np.random.default_rng(seed)
+    starts = []
+    for i in range(num_starts):
+        parafoil = start.copy()
+        for upper, mat in [(True, parafoil.upper_mat), (False, parafoil.lower_mat)]:
+            mapping, lower_bounds, upper_bounds = parafoil._get_bounds_and_mapping(*flags, upper=upper)
+            lower_bounds, upper_bounds = np.array(lower_bounds), np.array(upper_bounds)
+            inset = margin * (upper_bounds - lower_bounds)
+            values = parafoil._get_values(mapping, mat)
+            if i:
+                values = values * (1 + spread * rng.standard_normal(len(values)))
+            parafoil._set_values(mapping, mat, np.clip(values, lower_bounds + inset,
+                                                       upper_bounds - inset))
+        starts.append((parafoil.upper_mat, parafoil.lower_mat))
+    return starts
+
+
+def _calibrate_task(args):
+    """
+    calibrate one airfoil from all start points (executed by the workers),
+    the best fit of every side is kept. A failing start point is skipped,
+    the airfoil only fails if no start point succeeds.
+    returns a dict with the columns of calibrate_parafoils
+    """
+    index, name, coordinates, noseindex, starts, flags = args
+    row = {"airfoil": name, "airfoil_index": index, "failed_starts": 0}
+    best = [None, None]  # (least squares result, mat) of both sides
+    error = None
+    for upper_mat, lower_mat in starts:
+        parafoil = Parafoil(upper_mat, lower_mat)
+        try:
+            airfoil = Airfoil.from_array(np.array(coordinates), name, noseindex)
+            results = parafoil.calibrate(airfoil, *flags)
+            if not all(np.isfinite(result.cost) for result in results):
+                raise ValueError("the fit diverged (cost is not finite)")
+        except Exception as e:
+            row["failed_starts"] += 1
+            error = e
+            continue
+        for side, (result, mat) in enumerate(zip(results, [parafoil.upper_mat,
+                                                           parafoil.lower_mat])):
+            if best[side] is None or result.cost < best[side][0].cost:
+                best[side] = (result, mat)
+    if best[0] is None:
+        row["error"] = repr(error)
+        return row
+    distances = np.concatenate([best[0][0].fun, best[1][0].fun])
+    row.update({
+        "upper_mat": best[0][1].tolist(),
+        "lower_mat": best[1][1].tolist(),
+        "cost": best[0][0].cost + best[1][0].cost,
+        "rms_error": np.sqrt(np.mean(distances ** 2)),
+        "max_error": np.max(distances),
+        "error": None})
+    return row
+
+
+def calibrate_parafoils(airfoils, calibrate_x=False, calibrate_y=True, calibrate_w=False,
+                        start=None, num_starts=4, spread=0.2, seed=0, workers=None,
+                        chunksize=1):
+    """
+    fit a parafoil to every airfoil, eg. to build a database of parafoil
+    parameters for an airfoil library
+    airfoils: iterable of airfoils, eg. a list or an AirfoilLibrary
+    start: parafoil of the first start point (default: Parafoil()), the
+           other num_starts - 1 start points are random variations of it (see
+           spread and seed), the best fit of every side is kept
+    workers: number of worker processes, None fits all airfoils in this process
+    returns a DataFrame with one row per airfoil and the columns "airfoil"
+    (name), "airfoil_index", "upper_mat", "lower_mat" (fitted pole-matrices
+    as lists), "cost" (least squares cost of both sides), "rms_error" and
+    "max_error" (distances of the coordinates to the splines),
+    "failed_starts" (number of start points which raised an error) and
+    "error" (exception of the last start point if all of them failed)
+    """
+    import pandas as pd
+    start = Parafoil() if start is None else start
+    flags = (calibrate_x, calibrate_y, calibrate_w)
+    starts = _start_points(start, flags, num_starts, spread, seed)
+    tasks = ((i, airfoil.name, np.asarray(airfoil.coordinates), airfoil.noseindex, starts, flags)
+             for i, airfoil in enumerate(airfoils))
+    if not workers:
+        rows = [_calibrate_task(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(_calibrate_task, tasks, chunksize=chunksize))
+    columns = ["airfoil", "airfoil_index", "upper_mat", "lower_mat", "cost",
+               "rms_error", "max_error", "failed_starts", "error"]
+    return pd.DataFrame(rows, columns=columns)
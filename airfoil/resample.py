@@ -0,0 +1,163 @@
+import numpy as np
+
+# vectorized resampling of airfoil coordinates
+# all functions work on a single airfoil (coordinates with shape (P, 2)) or on
+# a batch of airfoils with the same number of points (shape (N, P, 2))
+
+
+def cos_distribution(numpoints):
+    """
+    return cosinus distributed x-values
+    """
+    numpoints -= numpoints % 2
+    x = np.arange(numpoints + 1) / numpoints
+    return ((x > 0.5) * 1. - (x < 0.5)) * (1 - np.sin(np.pi * x))
+
+
+def cos_2_distribution(numpoints):
+    """
+    return cosinus distributed x-values
+    double-cosinus -> neat distribution at nose and trailing edge
+    """
+    numpoints -= numpoints % 2
+    x = np.arange(numpoints + 1) / numpoints
+    return ((x > 0.5) * 1. - (x < 0.5)) * (1 + np.cos(2 * np.pi * x)) / 2
+
+
+def curvature(coordinates):
+    """
+    return the discrete curvature of the coordinates (the first and the last
+    value are set to zero)
+    """
+    # https://math.stackexchange.com/a/213678
+    coordinates = np.asarray(coordinates)
+    A = coordinates[..., 0:-3, :]
+    B = coordinates[..., 1:-2, :]
+    C = coordinates[..., 2:-1, :]
+    AB = np.linalg.norm(B - A, axis=-1)
+    BC = np.linalg.norm(C - B, axis=-1)
+    AC = np.linalg.norm(C - A, axis=-1)
+    cross = (B - A)[..., 0] * (C - A)[..., 1] - (B - A)[..., 1] * (C - A)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 2 * abs(cross) / (AB * BC * AC)
+    zeros = np.zeros(values.shape[:-1] + (1,))
+    return np.concatenate([zeros, values, zeros], axis=-1)
+
+
+def signed_x(coordinates, noseindex):
+    """
+    return the x-values of the coordinates with the upper side negative and
+    the lower side positive
+    noseindex: int or an array with one noseindex per airfoil
+    """
+    coordinates = np.asarray(coordinates)
+    noseindex = np.asarray(noseindex)[..., None]
+    index = np.arange(coordinates.shape[-2])
+    return ((index > noseindex) * 2 - 1) * coordinates[..., 0]
+
+
+def arc_length(coordinates):
+    """
+    return the cumulative length along the coordinates normalized to [0, 1]
+    """
+    coordinates = np.asarray(coordinates)
+    segments = np.linalg.norm(np.diff(coordinates, axis=-2), axis=-1)
+    zeros = np.zeros(segments.shape[:-1] + (1,))
+    length = np.concatenate([zeros, np.cumsum(segments, axis=-1)], axis=-1)
+    return length / length[..., -1:]
+
+
+def curvature_length(coordinates, curvature_factor=0.5):
+    """
+    return a parameter along the coordinates which combines the arc-length
+    (curvature_factor=0) and the cumulative curvature (curvature_factor=1),
+    normalized to [0, 1]
+    """
+    coordinates = np.asarray(coordinates)
+    length = arc_length(coordinates)
+    # curvature has one value less than coordinates, the end-points are 0
+    k = curvature(coordinates)
+    k = np.concatenate([k, np.zeros(k.shape[:-1] + (1,))], axis=-1)
+    k = np.nan_to_num(k)
+    # integrate the curvature over the arc-length
+    dk = (k[..., 1:] + k[..., :-1]) / 2 * np.diff(length, axis=-1)
+    zeros = np.zeros(dk.shape[:-1] + (1,))
+    cumulative = np.concatenate([zeros, np.cumsum(dk, axis=-1)], axis=-1)
+    cumulative /= cumulative[..., -1:]
+    return cumulative * curvature_factor + length * (1 - curvature_factor)
+
+
+def _searchsorted(parameter, targets):
+    """
+    row-wise np.searchsorted (side="right") of a batch of monotonic rows.
+    the rows are shifted to disjoint ranges so one call is sufficient.
+    """
+    low = min(parameter.min(), targets.min())
+    span = max(parameter.max(), targets.max()) - low + 1.
+    rows = np.arange(parameter.shape[0])[:, None]
+    shifted_parameter = (parameter - low + rows * span).ravel()
+    shifted_targets = (targets - low + rows * span).ravel()
+    index = np.searchsorted(shifted_parameter, shifted_targets, side="right")
+    return index.reshape(targets.shape) - rows * parameter.shape[1]
+
+
+def interpolate(coordinates, parameter, targets):
+    """
+    linear interpolation of the coordinates at the target values of a
+    increasing parameter (eg. signed_x or arc_length)
+    coordinates: (P, 2) or (N, P, 2)
+    parameter: (P,) or (N, P)
+    targets: (M,) or (N, M)
+    returns: (M, 2) or (N, M, 2)
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    single = coordinates.ndim == 2
+    coordinates = coordinates.reshape((-1,) + coordinates.shape[-2:])
+    numairfoils, numcoords = coordinates.shape[:2]
+    parameter = np.broadcast_to(parameter, (numairfoils, numcoords))
+    targets = np.asarray(targets, dtype=float)
+    targets = np.broadcast_to(targets, (numairfoils, targets.shape[-1]))
+
+    # the parameter is not strictly monotonic at the nose (signed_x), searching
+    # in the running maximum returns the first point beyond the target value
+    search_parameter = np.maximum.accumulate(parameter, axis=-1)
+    i = np.clip(_searchsorted(search_parameter, targets), 1, numcoords - 1)
+    rows = np.arange(numairfoils)[:, None]
+    p0 = parameter[rows, i - 1]
+    p1 = parameter[rows, i]
+    # interpolation:
+    # x1-----x1+ t*(x - x1)--------x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.nan_to_num((targets - p0) / (p1 - p0))[..., None]
+    result = coordinates[rows, i - 1] * (1 - t) + coordinates[rows, i] * t
+    return result[0] if single else result
+
+
+def resample(coordinates, noseindex, distribution="cos_2", numpoints=100,
+             curvature_factor=0.5):
+    """
+    resample coordinates of one or many airfoils
+    distribution:
+        "cos": cosinus distributed x-values
+        "cos_2": double-cosinus distributed x-values
+        "arc_length": constant distance between the new coordinates
+        "curvature": fine at high curvature (blended with the arc-length
+                     by curvature_factor)
+        array: signed x-values (upper side negative, lower side positive)
+    returns the new coordinates (numpoints + 1 values for even numpoints)
+    """
+    if isinstance(distribution, str):
+        if distribution == "cos":
+            distribution = cos_distribution(numpoints)
+        elif distribution == "cos_2":
+            distribution = cos_2_distribution(numpoints)
+        elif distribution == "arc_length":
+            targets = np.linspace(0, 1, numpoints - numpoints % 2 + 1)
+            return interpolate(coordinates, arc_length(coordinates), targets)
+        elif distribution == "curvature":
+            targets = np.linspace(0, 1, numpoints - numpoints % 2 + 1)
+            parameter = curvature_length(coordinates, curvature_factor)
+            return interpolate(coordinates, parameter, targets)
+        else:
+            raise ValueError("unknown distribution: {}".format(distribution))
+    return interpolate(coordinates, signed_x(coordinates, noseindex), distribution)
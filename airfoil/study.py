@@ -1,9 +1,22 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
 import pandas as pd
-import xfoil_interface_wrap as xiw
-from xfoil_interface import xfoil_options_type, xfoil_geom_options_type, \
-                            xfoil_data_group
-import copy
+
+from airfoil.panel_method import LinearVortexSolver
+try:
+    import xfoil_interface_wrap as xiw
+    from xfoil_interface import xfoil_options_type, xfoil_geom_options_type, \
+                                xfoil_data_group
+    XFOIL_IMPORT_ERROR = None
+except ImportError as e:
+    XFOIL_IMPORT_ERROR = e
 
 # TODO:
 # add other computations like pressure study, flow, boundary-layer ...
@@ -60,9 +73,26 @@ def lhs(samples, dimensions, min_values, max_values):
 
 
 
+def _input(params):
+    """
+    returns (input_key, value) of the params, a valid alpha_input is used
+    before the cl_input (eg. rows of a study with both columns)
+    """
+    alpha_input = params.get("alpha_input")
+    if alpha_input is not None and not np.isnan(alpha_input):
+        return "alpha_input", alpha_input
+    elif params.get("cl_input") is not None:
+        return "cl_input", params["cl_input"]
+    raise RuntimeError("you need to either set cl or alpha in params-dictionary")
+
+
 class XfoilCase(object):
     """
     Compute aerodynamics coefficients of an airfoil.
+    The airfoil is paneled once, the xfoil session is reused for all
+    following computations (as long as ncrit and max_iterations don't
+    change). Use the case as a context-manager or call close() to free the
+    memory of libxfoil.
     """
     default_params = {
         "re": 10000000,
@@ -72,19 +102,61 @@ class XfoilCase(object):
         "alpha_input": None  # use either cl_input or alpha_input
     }
     def __init__(self, airfoil):
+        if XFOIL_IMPORT_ERROR:
+            raise ImportError("xfoil disabled due to ImportError: {}".format(XFOIL_IMPORT_ERROR))
+        self._xdg = None
+        self._session_options = None
         self.airfoil = airfoil
 
+    @property
+    def airfoil(self):
+        return self._airfoil
+
+    @airfoil.setter
+    def airfoil(self, airfoil):
+        # a new geometry needs a new paneling
+        self.close()
+        self._airfoil = airfoil
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def __getstate__(self):
+        # the xfoil session can't be transferred to another process
+        state = self.__dict__.copy()
+        state["_xdg"] = None
+        state["_session_options"] = None
+        return state
+
+    def close(self):
+        """free the memory of the xfoil session"""
+        if getattr(self, "_xdg", None) is not None:
+            xiw.xfoil_cleanup(self._xdg)
+        self._xdg = None
+        self._session_options = None
+
     @property
     def _x_z_npoint(self):
         return (*self.airfoil.coordinates.T, len(self.airfoil))
-        
-        
-    def compute_coefficients(self, params=None, max_iterations=100):
-        params = params or XfoilCase.default_params
+
+    def _session(self, ncrit, max_iterations):
+        """
+        returns the xfoil session. A new session (with a new paneling) is only
+        created if there is no session or the options have changed.
+        """
+        if self._xdg is not None and self._session_options == (ncrit, max_iterations):
+            return self._xdg
+        self.close()
         x, z, npoint = self._x_z_npoint
 
         opts = xfoil_options_type()
-        opts.ncrit = params["ncrit"]
+        opts.ncrit = ncrit
         opts.xtript = 1.
         opts.xtripb = 1.
         opts.viscous_mode = True
@@ -109,24 +181,35 @@ class XfoilCase(object):
         xiw.xfoil_set_buffer_airfoil(xdg, x, z, npoint)
         xiw.xfoil_set_paneling(xdg, geom_opts)
         if (xiw.xfoil_smooth_paneling(xdg) != 0):
+            xiw.xfoil_cleanup(xdg)
             raise RuntimeError("libxfoil: Err 1")
         xnew, znew, stat = xiw.xfoil_get_current_airfoil(xdg, geom_opts.npan)
         if (stat != 0):
+            xiw.xfoil_cleanup(xdg)
             raise RuntimeError("libxfoil: Err 1")
 
+        self._xdg = xdg
+        self._session_options = (ncrit, max_iterations)
+        return xdg
+
+    def compute_coefficients(self, params=None, max_iterations=100):
+        params = params or XfoilCase.default_params
+        xdg = self._session(params["ncrit"], max_iterations)
+        # every case starts with a fresh boundary layer, so the result
+        # doesn't depend on the previously computed cases
+        xiw.xfoil_reinitialize_bl(xdg)
+
         xiw.xfoil_set_reynolds_number(xdg, params["re"])
         xiw.xfoil_set_mach_number(xdg, params["mach"])
-        if "cl_input" in params.keys():
-            alpha, cl, cd, cm, converged, stat = xiw.xfoil_speccl(xdg, params["cl_input"])
-        elif "alpha_input" in params.keys():
-            alpha, cl, cd, cm, converged, stat = xiw.xfoil_specal(xdg, params["alpha_input"])
+        input_key, value = _input(params)
+        if input_key == "alpha_input":
+            alpha, cl, cd, cm, converged, stat = xiw.xfoil_specal(xdg, value)
         else:
-            raise RuntimeError("you need to either set cl or alpha in params-dictionary")
+            alpha, cl, cd, cm, converged, stat = xiw.xfoil_speccl(xdg, value)
 
         if (stat != 0):
             raise RuntimeError("libxfoil: Err 3")
 
-        # xiw.xfoil_cleanup(xdg)
         response = {
             "alpha": alpha,
             "cl": cl,
@@ -138,28 +221,789 @@ class XfoilCase(object):
         return response
 
 
-class XfoilStudy(object):
+    def _march_polar(self, values, spec, params, max_iterations, max_halvings):
+        """
+        march through the (not empty) values with the xfoil spec-function
+        returns an array with the columns alpha, cl, cd, cm, converged
+        """
+        xdg = self._session(params["ncrit"], max_iterations)
+        xiw.xfoil_set_reynolds_number(xdg, params["re"])
+        xiw.xfoil_set_mach_number(xdg, params["mach"])
+
+        def solve(value):
+            alpha, cl, cd, cm, converged, stat = spec(xdg, value)
+            return alpha, cl, cd, cm, bool(converged) and stat == 0
+
+        def march(start, end):
+            result = solve(end)
+            halvings = 0
+            while not result[-1] and start is not None and halvings < max_halvings:
+                # restart from the last converged point with smaller steps
+                halvings += 1
+                xiw.xfoil_reinitialize_bl(xdg)
+                if not solve(start)[-1]:
+                    break
+                for value in np.linspace(start, end, 2 ** halvings + 1)[1:]:
+                    result = solve(value)
+                    if not result[-1]:
+                        break
+            if not result[-1]:
+                # don't use a diverged boundary layer as initial guess. The
+                # result may belong to an intermediate value of the halving,
+                # so the target gets no coefficients.
+                xiw.xfoil_reinitialize_bl(xdg)
+                return np.nan, np.nan, np.nan, np.nan, False
+            return result
+
+        polar = np.full((len(values), 5), np.nan)
+        polar[:, 4] = False
+        # march through the sorted values, the results are stored in the
+        # order of the given values
+        order = np.argsort(values, kind="stable")
+        sorted_values = values[order]
+        start_index = int(np.argmin(abs(sorted_values)))
+        upward = range(start_index, len(values))
+        downward = range(start_index - 1, -1, -1)
+        for indices in [upward, downward]:
+            xiw.xfoil_reinitialize_bl(xdg)
+            previous = None
+            if indices is downward and polar[order[start_index], 4]:
+                previous = sorted_values[start_index]
+                solve(previous)
+            for i in indices:
+                polar[order[i]] = march(previous, sorted_values[i])
+                if polar[order[i], 4]:
+                    previous = sorted_values[i]
+        return polar
+
+    def compute_polar(self, values, input_key="alpha_input", params=None,
+                      max_iterations=100, max_halvings=3):
+        """
+        compute a polar by marching through the values of alpha
+        (input_key="alpha_input") or cl (input_key="cl_input") in one session.
+        The boundary layer of the last converged point is the initial guess
+        for the next point. If a point doesn't converge, the step to it is
+        halved (max. max_halvings times), values which still don't converge
+        get nan coefficients (converged=False). The march starts at the value
+        closest to zero and goes up and down from there, the values don't
+        need to be sorted.
+        returns a dict of arrays (alpha, cl, cd, cm, converged, input_key,
+        re, mach, ncrit) in the order of the values
+        """
+        params = params or XfoilCase.default_params
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        if input_key == "alpha_input":
+            spec = xiw.xfoil_specal
+        elif input_key == "cl_input":
+            spec = xiw.xfoil_speccl
+        else:
+            raise ValueError("input_key has to be either alpha_input or cl_input")
+        if len(values):
+            polar = self._march_polar(values, spec, params, max_iterations, max_halvings)
+        else:
+            polar = np.zeros((0, 5))
+
+        return {
+            "alpha": polar[:, 0],
+            "cl": polar[:, 1],
+            "cd": polar[:, 2],
+            "cm": polar[:, 3],
+            "converged": polar[:, 4].astype(bool),
+            input_key: values,
+            "re": np.full(len(values), params["re"]),
+            "mach": np.full(len(values), params["mach"]),
+            "ncrit": np.full(len(values), params["ncrit"])
+        }
+
+
+class ThinAirfoilCase(object):
+    """
+    Pure-python stand-in for XfoilCase based on the thin airfoil theory
+    (inviscid lift and moment of the camber line, turbulent flat plate drag).
+    Useful to test studies without libxfoil.
+    """
+    default_params = XfoilCase.default_params
+
+    def __init__(self, airfoil, num_theta=200):
+        self.airfoil = airfoil
+        self.alpha_0, self.cm_c4 = self._camber_coefficients(num_theta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def compute_polar(self, values, input_key="alpha_input", params=None,
+                      max_iterations=100, max_halvings=3):
+        """
+        compute a polar for the values of alpha or cl (see XfoilCase.compute_polar)
+        """
+        params = params or ThinAirfoilCase.default_params
+        values = np.asarray(values, dtype=float)
+        other_key = "cl_input" if input_key == "alpha_input" else "alpha_input"
+        responses = [self.compute_coefficients(dict(params, **{input_key: value, other_key: None}))
+                     for value in values]
+        polar = {key: np.array([response[key] for response in responses])
+                 for key in ["alpha", "cl", "cd", "cm", "converged"]}
+        polar[input_key] = values
+        for key in ["re", "mach", "ncrit"]:
+            polar[key] = np.full(len(values), params[key])
+        return polar
+
+    def _camber_line(self, x):
+        def interp_side(side):
+            side = side[np.argsort(side[:, 0])]
+            return np.interp(x, side[:, 0], side[:, 1])
+        upper = interp_side(self.airfoil.get_upper_data())
+        lower = interp_side(self.airfoil.get_lower_data())
+        return (upper + lower) / 2
+
+    def _camber_coefficients(self, num_theta):
+        """
+        returns the zero-lift angle [rad] and the moment coefficient
+        around the quarter chord point of the camber line
+        """
+        theta = np.linspace(0, np.pi, num_theta + 1)
+        x = (1 - np.cos(theta)) / 2
+        slope = np.diff(self._camber_line(x)) / np.diff(x)
+        theta_m = (theta[1:] + theta[:-1]) / 2
+        d_theta = np.diff(theta)
+        alpha_0 = -1 / np.pi * np.sum(slope * (np.cos(theta_m) - 1) * d_theta)
+        a_1 = 2 / np.pi * np.sum(slope * np.cos(theta_m) * d_theta)
+        a_2 = 2 / np.pi * np.sum(slope * np.cos(2 * theta_m) * d_theta)
+        return alpha_0, np.pi / 4 * (a_2 - a_1)
+
+    def compute_coefficients(self, params=None, max_iterations=100):
+        params = params or ThinAirfoilCase.default_params
+        input_key, value = _input(params)
+        if input_key == "alpha_input":
+            alpha = value
+            cl = 2 * np.pi * (np.deg2rad(alpha) - self.alpha_0)
+        else:
+            cl = value
+            alpha = np.rad2deg(cl / 2 / np.pi + self.alpha_0)
+        response = {
+            "alpha": alpha,
+            "cl": cl,
+            "cd": 2 * 0.074 * params["re"] ** (-0.2),
+            "cm": self.cm_c4,
+            "converged": True
+        }
+        response.update(params)
+        return response
+
+
+class PanelCase(ThinAirfoilCase):
+    """
+    Pure-numpy inviscid case based on the linear-vortex panel method (see
+    airfoil.panel_method). The influence matrix is solved once per airfoil,
+    polars are computed for all values at once. The drag is estimated like
+    in ThinAirfoilCase.
+    """
+
     def __init__(self, airfoil):
+        self.airfoil = airfoil
+        self.solver = LinearVortexSolver(airfoil.coordinates)
+        # cl(alpha) = a * cos(alpha) + b * sin(alpha)
+        self._cl_cos, self._cl_sin = self.solver.cl([0., np.pi / 2])
+
+    def _alpha_from_cl(self, cl):
+        """angle of attack [deg] of the (smaller) solution for cl"""
+        amplitude = np.hypot(self._cl_cos, self._cl_sin)
+        phase = np.arctan2(self._cl_cos, self._cl_sin)
+        return np.rad2deg(np.arcsin(np.clip(cl / amplitude, -1, 1)) - phase)
+
+    def compute_polar(self, values, input_key="alpha_input", params=None,
+                      max_iterations=100, max_halvings=3):
+        """
+        compute a polar for the values of alpha or cl (see XfoilCase.compute_polar)
+        """
+        params = params or PanelCase.default_params
+        values = np.asarray(values, dtype=float)
+        alpha = values if input_key == "alpha_input" else self._alpha_from_cl(values)
+        result = self.solver.solve(np.deg2rad(alpha))
+        polar = {
+            "alpha": alpha,
+            "cl": result["cl"],
+            "cd": np.full(len(values), 2 * 0.074 * params["re"] ** (-0.2)),
+            "cm": result["cm"],
+            "converged": np.ones(len(values), dtype=bool),
+            input_key: values
+        }
+        for key in ["re", "mach", "ncrit"]:
+            polar[key] = np.full(len(values), params[key])
+        return polar
+
+    def compute_coefficients(self, params=None, max_iterations=100):
+        params = params or PanelCase.default_params
+        input_key, value = _input(params)
+        polar = self.compute_polar([value], input_key, params)
+        response = {key: polar[key][0].item() for key in ["alpha", "cl", "cd", "cm", "converged"]}
+        response.update(params)
+        return response
+
+
+RESULT_COLUMNS = ["re", "mach", "ncrit", "cl_input", "alpha_input",
+                  "alpha", "cl", "cd", "cm", "converged", "error"]
+
+
+class ResultCache(object):
+    """
+    Persistent, content-addressed cache for aerodynamic coefficients.
+    The key is a hash of the rounded coordinates, the parameters and the
+    solver options. The results are stored in a sqlite database which can
+    be shared by several processes.
+    """
+    def __init__(self, path, decimals=10, max_entries=None, max_age=None,
+                 evict_interval=100):
+        """
+        path: sqlite database file
+        decimals: coordinates are rounded before hashing
+        max_entries: max number of stored results (least recently used are evicted)
+        max_age: max age of a result in seconds
+        evict_interval: eviction is done every evict_interval writes
+        lookups don't write to the database: the hit/miss counters and the
+        access times are kept in memory and written in one transaction by
+        flush (every evict_interval lookups, before evict, by close and
+        total_stats)
+        """
+        self.path = os.path.abspath(path)
+        self.decimals = decimals
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.evict_interval = evict_interval
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._connection = None
+        self._pid = None
+        self._pending = {"hits": 0, "misses": 0}
+        self._accessed = {}
+
+    def __getstate__(self):
+        # every process opens its own connection and counts its own lookups
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        state["_pending"] = {"hits": 0, "misses": 0}
+        state["_accessed"] = {}
+        return state
+
+    @property
+    def connection(self):
+        # forked processes don't use the connection of the parent
+        if self._connection is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, response TEXT, created REAL, accessed REAL)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+            self._connection.execute(
+                "INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    @staticmethod
+    def _to_json(value):
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, float) and np.isnan(value):
+            return None
+        return value
+
+    def key(self, airfoil, params, solver="", **options):
+        """
+        returns the hash of the geometry, the parameters, the solver name and
+        further solver options
+        """
+        coordinates = np.round(np.asarray(airfoil.coordinates, dtype=float), self.decimals) + 0.
+        description = json.dumps({
+            "params": {key: self._to_json(value) for key, value in params.items()},
+            "solver": solver,
+            "options": {key: self._to_json(value) for key, value in options.items()}
+        }, sort_keys=True)
+        sha = hashlib.sha1(np.ascontiguousarray(coordinates).tobytes())
+        sha.update(description.encode())
+        return sha.hexdigest()
+
+    def _count(self, name):
+        self._pending[name] += 1
+        if sum(self._pending.values()) >= self.evict_interval:
+            self.flush()
+
+    def flush(self):
+        """write the counters and access times of the lookups (one transaction)"""
+        if not any(self._pending.values()):
+            return
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany("UPDATE stats SET value = value + ? WHERE name = ?",
+                                   [(value, name) for name, value in self._pending.items()])
+            connection.executemany("UPDATE results SET accessed = ? WHERE key = ?",
+                                   [(accessed, key) for key, accessed in self._accessed.items()])
+        self._pending = {"hits": 0, "misses": 0}
+        self._accessed = {}
+
+    def get(self, key):
+        """returns the stored response or None"""
+        row = self.connection.execute(
+            "SELECT response, created FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.max_age and time.time() - row[1] > self.max_age):
+            self.misses += 1
+            self._count("misses")
+            return None
+        self.hits += 1
+        self._accessed[key] = time.time()
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key, response):
+        now = time.time()
+        response = {k: self._to_json(value) for k, value in response.items()}
+        self.connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                (key, json.dumps(response), now, now))
+        self._writes += 1
+        if self._writes % self.evict_interval == 0:
+            self.evict()
+
+    def evict(self):
+        """remove results which are too old or exceed max_entries"""
+        self.flush()
+        if self.max_age:
+            self.connection.execute("DELETE FROM results WHERE created < ?",
+                                    (time.time() - self.max_age,))
+        if self.max_entries is not None:
+            self.connection.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results "
+                "ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def clear(self):
+        self.connection.execute("DELETE FROM results")
+        self.connection.execute("UPDATE stats SET value = 0")
+        self.hits = self.misses = 0
+        self._pending = {"hits": 0, "misses": 0}
+        self._accessed = {}
+
+    def total_stats(self):
+        """hits and misses of all processes which used this cache-file"""
+        self.flush()
+        return dict(self.connection.execute("SELECT name, value FROM stats").fetchall())
+
+
+class CachedCase(object):
+    """
+    wraps a case (eg. XfoilCase) and looks up the results of
+    compute_coefficients in a ResultCache before computing them
+    """
+    def __init__(self, case, cache):
+        self.case = case
+        self.cache = cache
+
+    @property
+    def airfoil(self):
+        return self.case.airfoil
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.cache.flush()
+        self.case.close()
+
+    def compute_coefficients(self, params=None, max_iterations=100):
+        params = params or self.case.default_params
+        key = self.cache.key(self.case.airfoil, params, type(self.case).__name__,
+                             max_iterations=max_iterations)
+        response = self.cache.get(key)
+        if response is None:
+            response = self.case.compute_coefficients(params, max_iterations)
+            self.cache.set(key, response)
+        response.update(params)
+        return response
+
+    def compute_polar(self, *args, **kwargs):
+        return self.case.compute_polar(*args, **kwargs)
+
+
+class ResultAccumulator(object):
+    """
+    Collects the responses of a study in numpy-columns which grow in chunks.
+    The DataFrame is only created once (to_dataframe). If a path is given,
+    every flush_rows rows are written to a new part-file in this directory
+    (parquet or feather if pyarrow is installed, csv otherwise).
+    """
+    float_columns = ["re", "mach", "ncrit", "cl_input", "alpha_input",
+                     "alpha", "cl", "cd", "cm"]
+    bool_columns = ["converged"]
+    object_columns = ["error"]
+
+    def __init__(self, capacity=1024, path=None, flush_rows=100000, file_format=None):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.file_format = file_format or self._default_format()
+        self.num_parts = 0
+        self.num_flushed = 0
+        self._capacity = capacity
+        self._size = 0
+        self._index = np.empty(capacity, dtype=object)
+        self._columns = {}
+        for key in self.float_columns + self.bool_columns + self.object_columns:
+            self._columns[key] = self._empty_column(key, capacity)
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def _default_format():
+        try:
+            import pyarrow
+            return "parquet"
+        except ImportError:
+            return "csv"
+
+    def __len__(self):
+        return self.num_flushed + self._size
+
+    def _fill_value(self, key):
+        """value of the rows which don't contain the key"""
+        if key in self.float_columns:
+            return np.nan
+        if key in self.bool_columns:
+            return False
+        return None  # unknown keys are stored in an object-column
+
+    def _empty_column(self, key, capacity):
+        value = self._fill_value(key)
+        dtype = object if value is None else type(value)
+        return np.full(capacity, value, dtype=dtype)
+
+    def _grow(self):
+        # the new rows are empty (not filled with copies of the old rows)
+        size, self._capacity = self._capacity, self._capacity * 2
+        index = np.empty(self._capacity, dtype=object)
+        index[:size] = self._index
+        self._index = index
+        for key, column in self._columns.items():
+            new_column = self._empty_column(key, self._capacity)
+            new_column[:size] = column
+            self._columns[key] = new_column
+
+    def append(self, response, index=None):
+        if self._size == self._capacity:
+            self._grow()
+        i = self._size
+        self._index[i] = len(self) if index is None else index
+        for key, value in response.items():
+            if key not in self._columns:
+                self._columns[key] = self._empty_column(key, self._capacity)
+            column = self._columns[key]
+            if column.dtype == float:
+                column[i] = np.nan if value is None else value
+            else:
+                column[i] = value
+        self._size += 1
+        if self.path and self._size >= self.flush_rows:
+            self.flush()
+
+    def _buffer_dataframe(self):
+        size = self._size
+        return pd.DataFrame({key: column[:size] for key, column in self._columns.items()},
+                            index=self._index[:size].tolist())
+
+    def flush(self):
+        """write the buffered rows to a new part-file"""
+        if not self.path or self._size == 0:
+            return
+        df = self._buffer_dataframe()
+        filename = os.path.join(self.path, "part-{:05d}.{}".format(self.num_parts, self.file_format))
+        if self.file_format == "parquet":
+            df.to_parquet(filename)
+        elif self.file_format == "feather":
+            df.reset_index().to_feather(filename)
+        else:
+            df.to_csv(filename)
+        self.num_parts += 1
+        self.num_flushed += self._size
+        self._size = 0
+        for key in self._columns:
+            # reset the reused buffer
+            self._columns[key][:] = self._fill_value(key)
+
+    def read_parts(self):
+        """generator over the DataFrames of the written part-files"""
+        for i in range(self.num_parts):
+            filename = os.path.join(self.path, "part-{:05d}.{}".format(i, self.file_format))
+            if self.file_format == "parquet":
+                yield pd.read_parquet(filename)
+            elif self.file_format == "feather":
+                yield pd.read_feather(filename).set_index("index")
+            else:
+                yield pd.read_csv(filename, index_col=0)
+
+    def to_dataframe(self):
+        """all rows (also the flushed ones) as a DataFrame"""
+        dfs = list(self.read_parts())
+        if self._size or not dfs:
+            dfs.append(self._buffer_dataframe())
+        columns = [key for key in RESULT_COLUMNS if key in dfs[0].columns]
+        extra_columns = [key for key in dfs[0].columns if key not in columns]
+        df = dfs[0] if len(dfs) == 1 else pd.concat(dfs)
+        return df[columns + extra_columns]
+
+
+class CaseTimeoutError(RuntimeError):
+    pass
+
+
+def _compute_case(case, params):
+    """
+    compute one case, exceptions are stored in the "error" entry of the
+    response instead of being raised.
+    """
+    try:
+        response = case.compute_coefficients(params)
+        response["error"] = None
+    except Exception as e:
+        response = {"alpha": np.nan, "cl": np.nan, "cd": np.nan, "cm": np.nan,
+                    "converged": False}
+        response.update(params)
+        response["error"] = "{}: {}".format(type(e).__name__, e)
+    return response
+
+
+def _compute_chunk(case_class, airfoil, chunk, cache=None):
+    """
+    compute a list of (index, params) tuples, this function is executed by
+    the worker-processes of XfoilStudy.run_study
+    """
+    case = case_class(airfoil)
+    if cache is not None:
+        case = CachedCase(case, cache)
+    with case:
+        return [(index, _compute_case(case, params)) for index, params in chunk]
+
+
+def _timeout_worker(connection, case_class, airfoils, cache=None):
+    """
+    worker process of _run_with_timeout: computes the (airfoil_index, params)
+    tasks it receives until it gets None. The case is kept as long as the
+    airfoil doesn't change.
+    """
+    current, case = None, None
+    try:
+        while True:
+            task = connection.recv()
+            if task is None:
+                break
+            i, params = task
+            if i != current:
+                if case is not None:
+                    case.close()
+                current, case = i, None
+                try:
+                    case = case_class(airfoils[i])
+                    if cache is not None:
+                        case = CachedCase(case, cache)
+                except Exception as e:
+                    current, case = None, None
+                    connection.send(_compute_case(_FailedCase(e), params))
+                    continue
+            connection.send(_compute_case(case, params))
+    finally:
+        if case is not None:
+            case.close()
+
+
+def _run_with_timeout(case_class, airfoils, tasks, workers, timeout, cache=None):
+    """
+    compute the tasks (list of (key, airfoil_index, params)) in worker
+    processes. The timeout is enforced by the parent: a worker which exceeds
+    the timeout for one case is terminated (which also stops a hanging
+    compiled solver) and replaced, the case is recorded as failed.
+    yields (key, response) as the cases are completed
+    """
+    import multiprocessing
+    from multiprocessing.connection import wait
+
+    def start_worker():
+        connection, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_timeout_worker,
+                                          args=(child, case_class, airfoils, cache),
+                                          daemon=True)
+        process.start()
+        child.close()
+        return connection, process
+
+    def stop_worker(connection, process):
+        process.terminate()
+        process.join()
+        connection.close()
+
+    pending = list(tasks)[::-1]
+    idle = [start_worker() for _ in range(min(workers, len(pending)))]
+    busy = {}  # connection: (process, key, params, deadline)
+    try:
+        while pending or busy:
+            while idle and pending:
+                connection, process = idle.pop()
+                key, i, params = pending.pop()
+                connection.send((i, params))
+                busy[connection] = (process, key, params, time.monotonic() + timeout)
+            next_deadline = min(deadline for _, _, _, deadline in busy.values())
+            ready = wait(list(busy), max(next_deadline - time.monotonic(), 0))
+            for connection in ready:
+                process, key, params, deadline = busy.pop(connection)
+                try:
+                    response = connection.recv()
+                    idle.append((connection, process))
+                except (EOFError, OSError):
+                    stop_worker(connection, process)
+                    error = RuntimeError("worker process exited with code {}".format(
+                        process.exitcode))
+                    response = _compute_case(_FailedCase(error), params)
+                    if pending:
+                        idle.append(start_worker())
+                yield key, response
+            now = time.monotonic()
+            for connection, (process, key, params, deadline) in list(busy.items()):
+                if deadline <= now:
+                    del busy[connection]
+                    stop_worker(connection, process)
+                    error = CaseTimeoutError("case exceeded timeout of {} s".format(timeout))
+                    yield key, _compute_case(_FailedCase(error), params)
+                    if pending:
+                        idle.append(start_worker())
+    finally:
+        for connection, process in idle:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        for connection, (process, _, _, _) in busy.items():
+            stop_worker(connection, process)
+
+
+class _FailedCase(object):
+    """stand-in case which raises the error of a failed chunk"""
+    def __init__(self, error):
+        self.error = error
+
+    def compute_coefficients(self, params=None, max_iterations=100):
+        raise self.error
+
+
+class XfoilStudy(object):
+    def __init__(self, airfoil, case_class=XfoilCase, cache=None):
+        """
+        airfoil: the airfoil which is analyzed
+        case_class: solver with the interface of XfoilCase (eg. ThinAirfoilCase)
+                    or the name of a registered backend (see airfoil.backends)
+        cache: a ResultCache which is used to look up computed cases
+        """
+        from airfoil.backends import get_backend
+        case_class = get_backend(case_class)
         self.df = self._empty_df
-        self.case = XfoilCase(airfoil)
+        self.airfoil = airfoil
+        self.case_class = case_class
+        self.cache = cache
+        self.case = case_class(airfoil)
+        if cache is not None:
+            self.case = CachedCase(self.case, cache)
 
     @property
     def _empty_df(self):
-        return pd.DataFrame(columns=["re", "mach", "ncrit", "cl_input", "alpha_input", \
-                                        "alpha", "cl", "cd", "cm", "converged"])
+        return pd.DataFrame(columns=RESULT_COLUMNS)
 
-    def run_study(self, params_df):
+    def run_study(self, params_df, workers=None, chunksize=1, ordered=True, timeout=None):
         """
         run a parameter study and add output to the studie's dataframe (df)
         in addition the output is also returned as a DataFrame object
+        workers: number of worker processes, None computes all cases in this
+                 process. processes are used because libxfoil has a global state.
+        chunksize: number of cases which are sent to a worker at once
+        ordered: keep the order of params_df, otherwise the cases are
+                 collected as they are completed
+        timeout: max time in seconds for a single case, a worker process
+                 which exceeds it is terminated and replaced (if workers is
+                 None, one worker process is used). The cases are sent one by
+                 one (chunksize is ignored).
+        failing cases don't abort the study, they are stored with
+        converged=False and the error message in the "error" column
         """
-        study_df = self._empty_df
-        for _, params in params_df.iterrows():
-            response = self.case.compute_coefficients(dict(params))
-            study_df = study_df.append(response, ignore_index=True)
-        self.df = self.df.append(study_df)
+        accumulator = ResultAccumulator(capacity=max(len(params_df), 1))
+        self._run(params_df, accumulator, workers, chunksize, ordered, timeout)
+        study_df = accumulator.to_dataframe()
+        self.df = study_df.copy() if self.df.empty else pd.concat([self.df, study_df])
         return study_df
 
+    def stream_study(self, params_df, path, workers=None, chunksize=1, ordered=True,
+                     timeout=None, flush_rows=100000, file_format=None):
+        """
+        run a parameter study which doesn't fit into memory. The results are
+        written to part-files in the directory path (see ResultAccumulator)
+        and are not added to the studie's dataframe.
+        returns the ResultAccumulator
+        """
+        accumulator = ResultAccumulator(capacity=min(max(len(params_df), 1), flush_rows),
+                                        path=path, flush_rows=flush_rows,
+                                        file_format=file_format)
+        self._run(params_df, accumulator, workers, chunksize, ordered, timeout)
+        accumulator.flush()
+        return accumulator
+
+    def _run(self, params_df, accumulator, workers=None, chunksize=1, ordered=True, timeout=None):
+        """compute all cases of params_df and append the responses to the accumulator"""
+        cases = list(zip(params_df.index, params_df.to_dict("records")))
+        if timeout:
+            tasks = [(position, 0, params) for position, (_, params) in enumerate(cases)]
+            results = _run_with_timeout(self.case_class, [self.airfoil], tasks,
+                                        workers or 1, timeout, self.cache)
+            if ordered:
+                results = sorted(results, key=lambda result: result[0])
+            for position, response in results:
+                accumulator.append(response, cases[position][0])
+            return
+        if not workers:
+            # reuse the case (and its solver session) of this study
+            for index, params in cases:
+                accumulator.append(_compute_case(self.case, params), index)
+            return
+        chunks = [cases[i:i + chunksize] for i in range(0, len(cases), chunksize)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_compute_chunk, self.case_class, self.airfoil,
+                                       chunk, self.cache): chunk
+                       for chunk in chunks}
+            for future in (futures if ordered else as_completed(futures)):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # eg. a crashed worker process
+                    results = [(index, _compute_case(_FailedCase(e), params))
+                               for index, params in futures[future]]
+                for index, response in results:
+                    accumulator.append(response, index)
+
     def _check_bounds(self, lower_bounds, upper_bounds):
         """
         check if boundary specification is correct and return the disabled
@@ -0,0 +1,68 @@
+import numpy as np
+
+# affine transformations of airfoil coordinates
+# all functions work on a single airfoil (coordinates with shape (P, 2)) or on
+# a batch of airfoils with the same number of points (shape (N, P, 2))
+
+
+class AffineTransform(object):
+    """
+    x_new = matrix . (x - origin)
+    matrix: (2, 2) or (N, 2, 2), origin: (2,) or (N, 2)
+    """
+
+    def __init__(self, matrix, origin):
+        self.matrix = np.asarray(matrix, dtype=float)
+        self.origin = np.asarray(origin, dtype=float)
+
+    def __repr__(self):
+        return "AffineTransform(matrix={}, origin={})".format(self.matrix.tolist(),
+                                                              self.origin.tolist())
+
+    def apply(self, coordinates, out=None):
+        """
+        transform the coordinates, the result is written to out if given
+        (out=coordinates transforms in place)
+        """
+        coordinates = np.asarray(coordinates)
+        matrix = self.matrix[..., None, :, :]
+        origin = self.origin[..., None, :]
+        x = coordinates[..., 0] - origin[..., 0]
+        y = coordinates[..., 1] - origin[..., 1]
+        if out is None:
+            out = np.empty(np.broadcast_shapes(coordinates.shape, origin.shape))
+        out[..., 0] = matrix[..., 0, 0] * x + matrix[..., 0, 1] * y
+        out[..., 1] = matrix[..., 1, 0] * x + matrix[..., 1, 1] * y
+        return out
+
+    def inverse(self):
+        """the transformation which reverts this transformation"""
+        matrix = np.linalg.inv(self.matrix)
+        origin = -np.einsum("...ij,...j->...i", self.matrix, self.origin)
+        return AffineTransform(matrix, origin)
+
+
+def normalization(coordinates, noseindex):
+    """
+    returns the transformation which normalizes the airfoil(s):
+        *Put the nose back to (0,0)
+        *De-rotate airfoil
+        *Reset its length to 1
+    """
+    coordinates = np.asarray(coordinates)
+    noseindex = np.asarray(noseindex)
+    if coordinates.ndim == 2:
+        nose = coordinates[noseindex]
+    else:
+        nose = coordinates[np.arange(len(coordinates)), noseindex]
+    diff = coordinates[..., 0, :] - nose  # put nose to (0,0)
+    norm_squared = diff[..., 0] ** 2 + diff[..., 1] ** 2
+
+    # Angle: a.b=|a|*|b|*sin(alpha)
+    sin_sq = -diff[..., 1] / norm_squared
+    cos_sq = diff[..., 0] / norm_squared
+    # de-rotate and scale
+    matrix = np.stack([np.stack([cos_sq, -sin_sq], axis=-1),
+                       np.stack([sin_sq, cos_sq], axis=-1)], axis=-2)
+    return AffineTransform(matrix, nose)
+
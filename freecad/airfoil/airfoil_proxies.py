@@ -1,12 +1,12 @@
 import os
 import numpy as np
-from scipy.interpolate import interp1d
 
 from freecad import app
 import FreeCADGui as gui
 import Part as part
 
 from airfoil import Airfoil
+from airfoil.parafoil import Parafoil
 from freecad.airfoil import RESOURCE_PATH
 
 
@@ -115,35 +115,29 @@ class NacaProxy(AirfoilProxy):
 
 class ParafoilProxy(Airfoil):
     """
-    A NURBS representation of an airfoil. 
+    A NURBS representation of an airfoil. The geometry and the fits are
+    implemented by airfoil.parafoil.Parafoil, the proxy only stores the
+    pole-matrices in the document.
     """
     def __init__(self, obj):
-
-        # defaulta airfoil
-        upper_array = [
-            [0.   , 0.   , 0.01 , 0.07 , 0.2  , 0.5  , 0.7  , 0.85 , 1.   ],
-            [0.   , 0.011, 0.029, 0.05 , 0.082, 0.083, 0.051, 0.034, 0.   ],
-            [0.   , 0.   , 0.   , 0.   , 0.   , 0.   , 0.   , 0.   , 0.   ],
-            [1.   , 1.   , 1.   , 1.   , 1.   , 1.   , 1.   , 1.   , 1.   ]
-            ]
-
-        lower_array = [
-            [ 0.   ,  0.   ,  0.01 ,  0.07 ,  0.2  ,  0.5  ,  0.7  ,  0.85 ,  1.   ],
-            [ 0.   , -0.008, -0.022, -0.038, -0.046, -0.036, -0.021, -0.012,  0.   ],
-            [ 0.   ,  0.   ,  0.   ,  0.   ,  0.   ,  0.   ,  0.   ,  0.   ,  0.   ],
-            [ 1.   ,  1.   ,  1.   ,  1.   ,  1.   ,  1.   ,  1.   ,  1.   ,  1.   ]
-            ]
+        # default airfoil
+        parafoil = Parafoil()
 
         obj.addProperty("App::PropertyPythonObject", "upper_array", "airfoil properties", "x, y, z, w of upper poles")
         obj.addProperty("App::PropertyPythonObject", "lower_array", "airfoil properties", "x, y, z, w of lower poles")
 
-        obj.upper_array = upper_array
-        obj.lower_array = lower_array
+        self.set_parafoil(obj, parafoil)
         obj.Proxy = self
 
+    def get_parafoil(self, obj):
+        return Parafoil(self.get_upper_array(obj), self.get_lower_array(obj))
+
+    def set_parafoil(self, obj, parafoil):
+        obj.upper_array = parafoil.upper_mat.tolist()
+        obj.lower_array = parafoil.lower_mat.tolist()
+
     def get_airfoil(self, obj, numpoints=50, curvature_factor=0.5):
-        coordinates = self.discretize(obj, numpoints, curvature_factor)
-        return Airfoil(coordinates)
+        return self.get_parafoil(obj).get_airfoil(numpoints, curvature_factor)
 
     def get_upper_array(self, obj):
         return np.array(obj.upper_array)
@@ -151,41 +145,6 @@ class ParafoilProxy(Airfoil):
     def get_lower_array(self, obj):
         return np.array(obj.lower_array)
 
-    @property
-    def x_mapping(self):
-        return [
-            [0, 2], # x2
-            [0, 3], # x3
-            [0, 4], # x4
-            [0, 5], # x5
-            [0, 6], # x6
-            [0, 7], # x7
-            ]
-
-    @property
-    def y_mapping(self):
-        return [
-            [1, 1], # y1
-            [1, 2], # y2
-            [1, 3], # y3
-            [1, 4], # y4
-            [1, 5], # y5
-            [1, 6], # y6
-            [1, 7], # y7
-        ]
-
-    @property
-    def w_mapping(self):
-        return [
-            [3, 1], # w1
-            [3, 2], # w2
-            [3, 3], # w3
-            [3, 4], # w4
-            [3, 5], # w5
-            [3, 6], # w6
-            [3, 7], # w7
-        ]
-
     @staticmethod
     def _spline_from_mat(mat):
         """
@@ -204,36 +163,11 @@ class ParafoilProxy(Airfoil):
         return bs
 
     def discretize(self, obj, numpoints=300, curvature_factor=1):
-        """returns an Airfoil"""
-        upper_spline = self._spline_from_mat(self.get_upper_array(obj))
-        lower_spline = self._spline_from_mat(self.get_lower_array(obj))
-
-        def compute_dist(spline):
-            std_dist = np.linspace(0, 1, 1000)
-            length = np.array([spline.length(0, i) for i in std_dist])
-            length /= length[-1]
-
-
-            curvature = np.array([0.] + [spline.curvature(i) for i in std_dist])[:-1]
-            curvature = np.cumsum(curvature) 
-            curvature /= curvature[-1]
-            curvature = curvature * curvature_factor + std_dist * (1 - curvature_factor)
-            curvature /= curvature[-1]
-
-            length_int = interp1d(length, std_dist)
-            curvature_int = interp1d(curvature, std_dist)
-            std_dist = np.linspace(0, 1, numpoints)
-            return curvature_int(length_int(std_dist))
-
-        upper_dist = compute_dist(upper_spline)
-        lower_dist = compute_dist(lower_spline)
-        upper_points = [upper_spline.value(i) for i in upper_dist]
-        lower_points = [lower_spline.value(i) for i in lower_dist]
-        upper_points = [[i[0], i[1]] for i in upper_points]
-        lower_points = [[i[0], i[1]] for i in lower_points]
-        coordinates = upper_points[::-1] + lower_points[1:]
-        return np.array(coordinates)
-
+        """
+        returns the coordinates of the upper and lower spline (evaluated with
+        numpy, see airfoil.nurbs)
+        """
+        return self.get_parafoil(obj).discretize(numpoints, curvature_factor)
 
     def execute(self, obj):
         upper_array = self.get_upper_array(obj)
@@ -243,128 +177,25 @@ class ParafoilProxy(Airfoil):
         wire = part.Wire([spline1.toShape(), spline2.toShape()])
         obj.Shape = wire
 
-
-    def _get_values(self, mapping, mat):
-        """
-        returns a flattened representation of all values which are allowed to be variated
-        """
-        values = []
-        for m in mapping:
-            values.append(mat[m[0]][m[1]])
-        return np.array(values)
-
-    def _set_values(self, mapping, mat, values):
+    def calibrate(self, obj, airfoil:Airfoil, calibrate_x:bool=False, calibrate_y:bool=True, calibrate_w:bool=False):
         """
-        sets values of mat by a flat vector of values (needs to have same length as mapping)
+        calibrates the splines to match the airfoil as good as possible (lstsq)
         """
-        for i, m in enumerate(mapping):
-            if m == [1, 1]:
-                # compute the corresponsing x-value
-                x, y, z, w = mat.T[1]
-                mat[0][1] = x * values[i] / y
-                mat[1][1] = values[i]
-            else:
-                mat[m[0]][m[1]] = values[i]
-        return mat
-
-
-##### maybe externalize
-    def _calibrate_one_side(self, start_mat, mapping, bounds, coordinates):
-        from scipy.optimize import least_squares
-        mat = start_mat
-
-        def cost_function(values, mat, coordinates):
-            mat = self._set_values(mapping, mat, values)
-            spline = self._spline_from_mat(mat)
-            edge = spline.toShape()
-            residuals = []
-            for x, y in coordinates:
-                vertex = part.Vertex(x, y, 0.)
-                dist = vertex.distToShape(edge)[0]
-                residuals.append(dist)
-            return residuals
-
-        start_values = self._get_values(mapping, mat)
-        best = least_squares(cost_function, start_values, bounds=bounds, method="dogbox",
-                             args=(mat, coordinates), gtol=1e-6, xtol=1e-6, verbose=2)
-        mat = self._set_values(mapping, mat, best.x)
-        return mat
+        parafoil = self.get_parafoil(obj)
+        parafoil.calibrate(airfoil, calibrate_x, calibrate_y, calibrate_w, verbose=2)
+        self.set_parafoil(obj, parafoil)
 
-    def calibrate(self, obj, airfoil:Airfoil, calibrate_x:bool=False, calibrate_y:bool=True, calibrate_w:bool=False):
+    def optimize(self, obj, target_function, optimize_x, optimize_y, optimize_w, numpoints=50,
+                 backend=None, target_jacobian=None):
         """
-        calibrates the splines to match the airfoil as good as possible (lstsq)
+        optimize the splines for a target_function which returns a list of
+        residuals, see airfoil.parafoil.Parafoil.optimize. The document is
+        updated with the best result only.
         """
-        mapping, lower_bounds_upper_spline, upper_bounds_upper_spline = self._get_bounds_and_mapping(calibrate_x, calibrate_y, calibrate_w, upper=True)
-        mapping, lower_bounds_lower_spline, upper_bounds_lower_spline = self._get_bounds_and_mapping(calibrate_x, calibrate_y, calibrate_w, upper=False)
-        bounds_upper_spline = (lower_bounds_upper_spline, upper_bounds_upper_spline)
-        bounds_lower_spline = (lower_bounds_lower_spline, upper_bounds_lower_spline)
-
-        upper_array = obj.Proxy.get_upper_array(obj)
-        lower_array = obj.Proxy.get_lower_array(obj)
-        new_upper_mat = self._calibrate_one_side(upper_array, mapping, bounds_upper_spline, airfoil.get_upper_data()[::-1])
-        new_lower_mat = self._calibrate_one_side(lower_array, mapping, bounds_lower_spline, airfoil.get_lower_data())
-        obj.upper_array = new_upper_mat.tolist()
-        obj.lower_array = new_lower_mat.tolist()
-
-    def _get_bounds_and_mapping(self, calibrate_x:bool=False, calibrate_y:bool=True, calibrate_w:bool=False, upper=True):
-        x_lower_bounds = [0. ] * 6
-        x_upper_bounds = [1. ] * 6
-        y_lower_bounds = [-1.] * 7
-        y_upper_bounds = [1. ] * 7
-        w_lower_bounds = [0.1] * 7
-        w_upper_bounds = [1.]  * 7
-        if upper:
-            y_lower_bounds[0] = 0
-        else:
-            y_upper_bounds[0] = 0
-        upper_bounds = []
-        lower_bounds = []
-        mapping = []
-
-        if calibrate_x:
-            lower_bounds += x_lower_bounds
-            upper_bounds += x_upper_bounds
-            mapping += self.x_mapping
-        if calibrate_y:
-            lower_bounds += y_lower_bounds
-            upper_bounds += y_upper_bounds
-            mapping += self.y_mapping
-        if calibrate_w:
-            lower_bounds += w_lower_bounds
-            upper_bounds += w_upper_bounds
-            mapping += self.w_mapping
-        return mapping, lower_bounds, upper_bounds
-
-
-    def optimize(self, obj, target_function, optimize_x, optimize_y, optimize_w, numpoints=50):
-        from scipy.optimize import least_squares
-        mapping, lower_bounds_upper_spline, upper_bounds_upper_spline = self._get_bounds_and_mapping(optimize_x, optimize_y, optimize_w, upper=True)
-        mapping, lower_bounds_lower_spline, upper_bounds_lower_spline = self._get_bounds_and_mapping(optimize_x, optimize_y, optimize_w, upper=False)
-
-        bounds = (lower_bounds_upper_spline + lower_bounds_lower_spline, 
-                  upper_bounds_upper_spline + upper_bounds_lower_spline)
-
-        upper_array = obj.Proxy.get_upper_array(obj)
-        lower_array = obj.Proxy.get_lower_array(obj)
-
-        upper_start_values = self._get_values(mapping, upper_array)
-        lower_start_values = self._get_values(mapping, lower_array)
-        start_values = np.array(upper_start_values.tolist() + lower_start_values.tolist())
-
-        def cost_function(values):
-            upper_mat = self._set_values(mapping, upper_array, values[:int(len(values) / 2)])
-            lower_mat = self._set_values(mapping, lower_array, values[int(len(values) / 2):])
-            obj.upper_array = upper_mat.tolist()
-            obj.lower_array = lower_mat.tolist()
-            airfoil = self.get_airfoil(obj, numpoints)
-            try:                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                          
-                residuals = target_function(airfoil)
-            except Exception:
-                return 1.  # return a high value
-            return sum(residuals)
-            
-        best = least_squares(cost_function, start_values, bounds=bounds, method="dogbox",
-                             gtol=1e-6, xtol=1e-7, verbose=2)
+        parafoil = self.get_parafoil(obj)
+        best = parafoil.optimize(target_function, optimize_x, optimize_y, optimize_w, numpoints,
+                                 backend, target_jacobian, verbose=2)
+        self.set_parafoil(obj, parafoil)
         return best
 
 
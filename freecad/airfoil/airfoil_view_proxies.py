@@ -9,6 +9,7 @@ from freecad import app
 import FreeCADGui as gui
 import Part as part
 
+from airfoil import geometry
 from freecad.airfoil import RESOURCE_PATH
 from freecad.airfoil import airfoil_proxies
 
@@ -411,7 +412,7 @@ class ParafoilOptimizer(object):
 
         self.q_run.clicked.connect(self.optimize)
 
-    def table_to_function(self):
+    def read_table(self):
         rows = self.target_table.rowCount()
         cols = self.target_table.columnCount()
         table = []
@@ -434,17 +435,19 @@ class ParafoilOptimizer(object):
                 assert len(row) == 5
                 table.append(row)
         print(table)
+        return table
+
+    def table_to_function(self, table):
         # create function
 
-        def target_function(airfoil):
-            def xfoil_foo(airfoil, cl_input, re):
-                from airfoil import XfoilCase
+        def target_function(airfoil, case):
+            def xfoil_foo(cl_input, re):
                 app.activeDocument().recompute()
                 gui.updateGui()
-                case = XfoilCase(airfoil)
-                params = XfoilCase.default_params
+                params = dict(case.default_params)
                 params["re"] = re
                 params["cl_input"] = cl_input
+                params["alpha_input"] = None
                 response = case.compute_coefficients(params)
                 print(response)
                 return response["cd"], response["cm"]
@@ -452,21 +455,41 @@ class ParafoilOptimizer(object):
             residuals = []
             for row in table:
                 tp, cl, re, weight, target_value = row
-                cd, cm = xfoil_foo(airfoil, cl, re)
+                if tp == "area_target":
+                    # geometric target, see table_to_jacobian
+                    residuals.append(weight * (geometry.area(airfoil.coordinates) - target_value))
+                    continue
+                cd, cm = xfoil_foo(cl, re)
                 if row[0] == "cd_min":
                     residuals.append(weight * cd)
                 elif row[0] == "glide_max":
                     residuals.append(weight * cl / cd)
                 elif row[0] == "cm_target":
-                    residuals.append(cm - targetvalue)
+                    residuals.append(cm - target_value)
 
             return residuals
 
         return target_function
 
+    def table_to_jacobian(self, table):
+        """
+        derivatives of the residuals with respect to the coordinates if all
+        targets are geometric (see Parafoil.optimize), otherwise None (finite
+        differences of the xfoil results)
+        """
+        if not table or any(row[0] != "area_target" for row in table):
+            return None
+
+        def target_jacobian(airfoil, case):
+            return [row[3] * geometry.area_jacobian(airfoil.coordinates) for row in table]
+
+        return target_jacobian
+
     def optimize(self):
         opt_x = self.q_optimize_x.isChecked()
         opt_y = self.q_optimize_y.isChecked()
         opt_w = self.q_optimize_w.isChecked()
-        self.obj.Proxy.optimize(self.obj, self.table_to_function(), opt_x, opt_y, opt_w)
+        table = self.read_table()
+        self.obj.Proxy.optimize(self.obj, self.table_to_function(table), opt_x, opt_y, opt_w,
+                                backend="xfoil", target_jacobian=self.table_to_jacobian(table))
 
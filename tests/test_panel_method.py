@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from airfoil.airfoil import Airfoil
+from airfoil.panel_method import LinearVortexSolver
+
+
+def analytic_cl(airfoil, alpha):
+    """cl of the conformal mapping for the angle of attack against the chord line"""
+    mapping = airfoil.conformal_mapping
+    leading_edge, trailing_edge = mapping.chord_line()
+    return mapping.cl(alpha + np.angle(trailing_edge - leading_edge))
+
+
+@pytest.mark.parametrize("midpoint", [-0.1 + 0.1j, -0.1 + 0.2j])
+def test_joukowsky_cl(midpoint):
+    # the cusped trailing edge of the joukowsky airfoil
+    alpha = np.deg2rad([-4., 0., 4., 8.])
+    errors = []
+    for numpoints in (100, 200, 400):
+        airfoil = Airfoil.compute_joukowsky(midpoint, numpoints)
+        cl = LinearVortexSolver(airfoil.coordinates).cl(alpha)
+        errors.append(np.max(abs(cl - analytic_cl(airfoil, alpha))))
+    assert errors[-1] < 1e-3
+    assert errors[-1] < errors[0]
+
+
+def test_joukowsky_batch():
+    airfoils = [Airfoil.compute_joukowsky(midpoint, 200)
+                for midpoint in (-0.1 + 0.1j, -0.05 + 0.05j)]
+    coordinates = np.stack([airfoil.coordinates for airfoil in airfoils])
+    cl = LinearVortexSolver(coordinates).cl([0., 0.1])
+    for airfoil, airfoil_cl in zip(airfoils, cl):
+        assert np.allclose(airfoil_cl, LinearVortexSolver(airfoil.coordinates).cl([0., 0.1]))
+        assert np.allclose(airfoil_cl, analytic_cl(airfoil, np.array([0., 0.1])), atol=2e-3)
+
+
+def test_symmetric_airfoil():
+    solver = LinearVortexSolver(Airfoil.compute_naca("0012", 200).coordinates)
+    cl = solver.cl([-0.1, 0., 0.1])
+    assert abs(cl[1]) < 1e-10
+    assert np.isclose(cl[0], -cl[2])